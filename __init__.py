@@ -10,127 +10,987 @@ bl_info = {
 
 import bpy
 import os
+import re
+import hashlib
+from time import perf_counter
 from . import update_checker
+from . import profiling
+from . import rules
+from . import texture_packer
+from . import content_cache
 
-# Function to replace the node connected to Material Output
-def replace_node_group(context):
-    # Define the node groups to replace
-    replacements = {
-        "PhlankaFortnite": "FPv3 Material",  # Will replace FPv3 Material nodes
-        "PhlankaGlassFortnite": "FPv3 Glass",  # Will specifically replace FPv3 Glass nodes
-        "PhlankaLayersFortnite": "FPv3 Layer"  # Will specifically replace FPv3 Layer nodes
-    }
+# Custom property stamped on appended groups so later runs can tell they are current
+ASSET_STAMP_PROP = "phlanka_asset_hash"
 
-    # Load the node groups from Assets.blend
-    addon_dir = os.path.dirname(__file__)
-    assets_path = os.path.join(addon_dir, "Assets.blend")
-    
-    if not os.path.exists(assets_path):
-        bpy.ops.error.message('INVOKE_DEFAULT', message="Assets.blend not found!")
-        return {'CANCELLED'}
+# Addon preferences, or None when the addon isn't registered (e.g. headless batch runs)
+def get_preferences():
+    addon = bpy.context.preferences.addons.get(__name__)
+    return addon.preferences if addon else None
+
+# The Assets.blend to use: the shared library from the preferences, or the bundled one
+def get_assets_path():
+    prefs = get_preferences()
+    if prefs and prefs.shared_assets_path:
+        return os.path.normpath(bpy.path.abspath(prefs.shared_assets_path))
+    return os.path.join(os.path.dirname(__file__), "Assets.blend")
+
+# Whether the Phlanka groups are linked from the library instead of appended into the file
+def use_linked_assets():
+    prefs = get_preferences()
+    return bool(prefs and prefs.asset_mode == 'LINK')
+
+def is_same_file(path_a, path_b):
+    return os.path.normcase(os.path.realpath(path_a)) == os.path.normcase(os.path.realpath(path_b))
+
+# Find a group linked from the given library file
+def find_linked_group(name, assets_path):
+    for group in bpy.data.node_groups:
+        if group.library and group.name == name and is_same_file(bpy.path.abspath(group.library.filepath), assets_path):
+            return group
+    return None
+
+# The compiled replacement rules shipped next to the Assets.blend in use.
+# Which FPv3 groups are replaced by which Phlanka group lives in replacement_rules.json.
+def get_replacement_rules(assets_path=None):
+    rules_path = rules.find_rules_file(assets_path or get_assets_path(), os.path.dirname(__file__))
+    if rules_path is None:
+        raise FileNotFoundError(f"{rules.RULES_FILENAME} not found")
+    return rules.load_rules(rules_path)
+
+# Hash Assets.blend, reading the file only when it changed on disk. SHA-1 as
+# before, so groups stamped by earlier versions stay valid.
+def get_asset_hash(assets_path):
+    return content_cache.file_digest(assets_path, "sha1")
+
+# Return the Phlanka node groups linked from assets_path, linking only those not linked yet
+def link_phlanka_groups(assets_path, names):
+    loaded_groups = {name: find_linked_group(name, assets_path) for name in names}
+    missing = [name for name, group in loaded_groups.items() if group is None]
+    if not missing:
+        return loaded_groups
+
+    # Linked data follows the library file, so no version stamp is needed
+    with bpy.data.libraries.load(assets_path, link=True, relative=True) as (data_from, data_to):
+        requested = [name for name in missing if name in data_from.node_groups]
+        data_to.node_groups = requested
+
+    for name, new_group in zip(requested, data_to.node_groups):
+        if new_group is not None:
+            loaded_groups[name] = new_group
+    return loaded_groups
+
+# Return the Phlanka node groups, appending from Assets.blend only those that are missing or stale
+def load_phlanka_groups(assets_path, link=False, names=None):
+    if names is None:
+        names = get_replacement_rules(assets_path).targets
+    if link:
+        return link_phlanka_groups(assets_path, names)
+
+    asset_hash = get_asset_hash(assets_path)
+
+    loaded_groups = {}
+    for name in names:
+        group = bpy.data.node_groups.get(name)
+        # Only reuse local groups stamped with the shipped version
+        if group and not group.library and group.get(ASSET_STAMP_PROP) == asset_hash:
+            loaded_groups[name] = group
+        else:
+            loaded_groups[name] = None
+
+    missing = [name for name, group in loaded_groups.items() if group is None]
+    if not missing:
+        return loaded_groups
 
-    # Load all required node groups
     with bpy.data.libraries.load(assets_path, link=False) as (data_from, data_to):
-        groups_to_load = [name for name in replacements.keys() if name in data_from.node_groups]
-        if not groups_to_load:
-            bpy.ops.error.message('INVOKE_DEFAULT', message="Required node groups not found in Assets.blend!")
-            return {'CANCELLED'}
-        data_to.node_groups = groups_to_load
+        requested = [name for name in missing if name in data_from.node_groups]
+        data_to.node_groups = requested
 
-    # Check if we loaded the groups successfully
-    loaded_groups = {name: bpy.data.node_groups.get(name) for name in replacements.keys()}
-    if not any(loaded_groups.values()):
-        return {'CANCELLED'}
+    for name, new_group in zip(requested, data_to.node_groups):
+        if new_group is None:
+            continue
+        # An outdated copy makes Blender append this one as "Name.001"; move every
+        # user of the old copy over and take its name so copies never pile up
+        old_group = bpy.data.node_groups.get(name)
+        if old_group and old_group != new_group and not old_group.library:
+            old_group.user_remap(new_group)
+            bpy.data.node_groups.remove(old_group)
+        new_group.name = name
+        new_group[ASSET_STAMP_PROP] = asset_hash
+        loaded_groups[name] = new_group
 
-    # Process all objects in the scene
-    processed_materials = set()  # Track materials we've already processed
-    
+    return loaded_groups
+
+# Strip Blender's ".001" style duplicate suffix from a datablock name
+def base_name(name):
+    head, sep, tail = name.rpartition('.')
+    return head if sep and tail.isdigit() else name
+
+# Point every user of a Phlanka group at the groups linked from assets_path, replacing
+# appended copies and groups linked from other (older) libraries, so a file picks up a
+# new group version without reconverting. Returns the number of groups replaced.
+def relink_phlanka_groups(assets_path):
+    names = get_replacement_rules(assets_path).targets
+    linked_groups = link_phlanka_groups(assets_path, names)
+
+    # The shared library may have been updated on disk since the file was opened;
+    # reloading invalidates the group references, so look them up again afterwards
+    for library in {group.library for group in linked_groups.values() if group}:
+        library.reload()
+    linked_groups = {name: find_linked_group(name, assets_path) for name in names}
+
+    replaced = 0
+    for group in list(bpy.data.node_groups):
+        new_group = linked_groups.get(base_name(group.name))
+        if new_group is None or group == new_group:
+            continue
+        group.user_remap(new_group)
+        bpy.data.node_groups.remove(group)
+        replaced += 1
+    return replaced
+
+# Local FPv3 groups (any group a replacement rule matches) plus every subgroup and
+# image reachable from them, keyed by pointer
+def collect_fpv3_data():
+    replacement_rules = get_replacement_rules()
+    collected = {}
+    stack = [group for group in bpy.data.node_groups
+             if not group.library and group.name not in replacement_rules.targets
+             and (replacement_rules.target_for(group.name) or replacement_rules.target_for(base_name(group.name)))]
+    while stack:
+        tree = stack.pop()
+        if tree.as_pointer() in collected:
+            continue
+        collected[tree.as_pointer()] = tree
+        for node in tree.nodes:
+            if node.type == 'GROUP' and node.node_tree and not node.node_tree.library:
+                stack.append(node.node_tree)
+            elif node.type == 'TEX_IMAGE' and node.image and not node.image.library:
+                collected[node.image.as_pointer()] = node.image
+    return collected
+
+# Approximate memory held by an image's loaded pixels
+def image_bytes(image):
+    if not image.has_data:
+        return 0
+    width, height = image.size
+    return width * height * image.channels * (4 if image.is_float else 1)
+
+# Remove the FPv3 groups, subgroups and images nobody uses any more. Only data
+# reachable from the FPv3 groups is considered and anything with a user (including
+# a fake user) is kept. Returns (groups removed, images removed, image bytes freed).
+def purge_orphaned_fpv3_data():
+    candidates = collect_fpv3_data()
+    removed_groups = removed_images = freed_bytes = 0
+
+    # Removing a group releases its subgroups and images, so repeat until nothing changes
+    while True:
+        orphans = [data for data in candidates.values() if data.users == 0]
+        if not orphans:
+            break
+        for data in orphans:
+            del candidates[data.as_pointer()]
+            if isinstance(data, bpy.types.Image):
+                removed_images += 1
+                freed_bytes += image_bytes(data)
+            else:
+                removed_groups += 1
+        bpy.data.batch_remove(orphans)
+
+    return removed_groups, removed_images, freed_bytes
+
+# Packed DayZ textures go here unless the preferences say otherwise
+DEFAULT_TEXTURE_DIR = "//DayZ/"
+
+# Folder the DayZ maps are written to, or None when it is relative to an unsaved file
+def get_texture_output_dir():
+    prefs = get_preferences()
+    path = prefs.texture_output_dir if prefs and prefs.texture_output_dir else DEFAULT_TEXTURE_DIR
+    if path.startswith("//") and not bpy.data.filepath:
+        return None
+    return bpy.path.abspath(path)
+
+# Shared on-disk cache of packed textures, or None when disabled
+def get_content_cache():
+    prefs = get_preferences()
+    if prefs and not prefs.use_cache:
+        return None
+    root = bpy.path.abspath(prefs.cache_dir) if prefs and prefs.cache_dir else content_cache.default_cache_dir()
+    max_mb = prefs.cache_max_mb if prefs else content_cache.DEFAULT_MAX_MB
+    return content_cache.get_cache(root, max_mb * 1024 * 1024)
+
+# Pointers of every Phlanka group in the file, including numbered copies from older runs
+def phlanka_group_pointers(replacement_rules):
+    targets = set(replacement_rules.targets)
+    return {group.as_pointer() for group in bpy.data.node_groups if base_name(group.name) in targets}
+
+# Write the DayZ maps for materials using the Phlanka groups, returns (files written, materials packed)
+def pack_dayz_textures(materials, replacement_rules):
+    output_dir = get_texture_output_dir()
+    if output_dir is None:
+        raise OSError("save the .blend file first, the texture folder is relative to it")
+    return texture_packer.pack_materials(materials, phlanka_group_pointers(replacement_rules), output_dir,
+                                         cache=get_content_cache())
+
+# Properties that only affect how a node or material is shown, ignored when comparing
+UI_ONLY_PROPERTIES = frozenset([
+    "name", "label", "location", "location_absolute", "width", "height", "select",
+    "show_options", "show_preview", "show_texture", "hide", "use_custom_color", "color",
+    "parent", "use_fake_user", "use_extra_user", "paint_active_slot", "preview_render_type",
+])
+
+# Comparable property identifiers per RNA type, collected once per type
+_comparable_properties = {}
+
+def comparable_properties(data):
+    identifiers = _comparable_properties.get(data.bl_rna.identifier)
+    if identifiers is None:
+        identifiers = _comparable_properties[data.bl_rna.identifier] = tuple(
+            prop.identifier for prop in data.bl_rna.properties
+            if not prop.is_readonly and prop.type != 'COLLECTION' and prop.identifier not in UI_ONLY_PROPERTIES
+        )
+    return identifiers
+
+# Turn an RNA value into something hashable and stable between equivalent materials
+def canonical_value(value):
+    if isinstance(value, float):
+        return round(value, 6)
+    if value is None or isinstance(value, (bool, int, str)):
+        return value
+    if isinstance(value, bpy.types.ID):
+        return value.name_full
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(value))
+    if hasattr(value, "__len__"):
+        return tuple(canonical_value(item) for item in value)
+    return repr(value)
+
+# Hash a material's settings and node tree: node types and properties, group names,
+# unlinked default values, image references and link topology
+def canonical_material_hash(material):
+    node_tree = material.node_tree
+    nodes = []
+    for node in node_tree.nodes:
+        properties = tuple(canonical_value(getattr(node, identifier, None)) for identifier in comparable_properties(node))
+        defaults = tuple(
+            canonical_value(socket.default_value) if not socket.is_linked and hasattr(socket, "default_value") else None
+            for socket in node.inputs
+        )
+        nodes.append((node.name, node.bl_idname, properties, defaults))
+    nodes.sort(key=lambda entry: entry[0])
+    links = sorted(
+        (link.from_node.name, link.from_socket.identifier, link.to_node.name, link.to_socket.identifier, link.is_muted)
+        for link in node_tree.links
+    )
+    settings = tuple(canonical_value(getattr(material, identifier, None)) for identifier in comparable_properties(material))
+    return hashlib.sha1(repr((settings, nodes, links)).encode()).hexdigest()
+
+# Merge structurally identical copies of a material (M_Foo, M_Foo.001, ...) into one
+# survivor so only unique materials get converted. Returns the number of materials merged.
+def merge_duplicate_materials():
+    survivors = {}
+    remap = {}
+    for material in bpy.data.materials:
+        if material.library or not material.node_tree:
+            continue
+        # Only copies sharing a base name are merged, so differently named materials stay apart
+        key = (base_name(material.name), canonical_material_hash(material))
+        survivor = survivors.setdefault(key, material)
+        if survivor != material:
+            remap[material.as_pointer()] = (material, survivor)
+    if not remap:
+        return 0
+
+    # Object slots hold nearly every reference, so remap them directly in one pass
     for obj in bpy.data.objects:
-        # Skip objects without materials
-        if not hasattr(obj, 'material_slots') or len(obj.material_slots) == 0:
+        if obj.library:
             continue
-            
         for slot in obj.material_slots:
-            material = slot.material
-            
-            # Skip if no material, no node tree, or already processed
-            if not material or not material.node_tree or material.name in processed_materials:
+            entry = slot.material and remap.get(slot.material.as_pointer())
+            if not entry:
+                continue
+            if slot.link == 'DATA' and obj.data.library:
+                continue
+            slot.material = entry[1]
+
+    # Anything else still pointing at a duplicate goes through the slower generic remap
+    duplicates = []
+    for material, survivor in remap.values():
+        if material.users - int(material.use_fake_user) > 0:
+            material.user_remap(survivor)
+        if material.users == 0:
+            duplicates.append(material)
+    bpy.data.batch_remove(duplicates)
+    return len(duplicates)
+
+# Image texture nodes feeding a Phlanka group input in the given node trees, keyed by image pointer
+def collect_phlanka_texture_nodes(node_trees, group_pointers):
+    texture_nodes = {}
+    for node_tree in node_trees:
+        for node in node_tree.nodes:
+            if node.type != 'GROUP' or not node.node_tree or node.node_tree.as_pointer() not in group_pointers:
+                continue
+            for socket in node.inputs:
+                texture = socket.is_linked and texture_packer.find_source_node(socket)
+                if texture and texture.image:
+                    nodes = texture_nodes.setdefault(texture.image.as_pointer(), {})
+                    nodes[texture.as_pointer()] = texture
+    return texture_nodes
+
+# Point every image texture node feeding a Phlanka group at one canonical image
+# per distinct pixel content, and remove the copies nothing else uses.
+# Returns (images merged, texture nodes remapped, image bytes freed).
+def merge_duplicate_images(node_trees, group_pointers):
+    texture_nodes = collect_phlanka_texture_nodes(node_trees, group_pointers)
+    images = {}
+    for nodes in texture_nodes.values():
+        image = next(iter(nodes.values())).image
+        images[image.as_pointer()] = image
+
+    # Cheap prefilter: only images with the same size and pixel format can match.
+    # Tiled and movie images expose a single frame or tile, so they are left alone
+    candidates = {}
+    for pointer, image in images.items():
+        if image.source not in {'FILE', 'GENERATED'} or not image.size[0] or not image.size[1]:
+            continue
+        key = (tuple(image.size), image.channels, image.is_float, image.colorspace_settings.name, image.alpha_mode)
+        candidates.setdefault(key, []).append(image)
+
+    merged = remapped = freed_bytes = 0
+    duplicates = []
+    for group in candidates.values():
+        if len(group) < 2:
+            continue
+
+        # Identical source files decode to identical pixels, so only one of them is read.
+        # Unsaved edits aren't in the source bytes, so edited images always hash their pixels,
+        # and packed copies are only paired with other packed copies
+        pixel_hashes = {}
+        by_content = {}
+        for image in group:
+            digest = None if image.is_dirty else content_cache.image_digest(image)
+            if digest is not None:
+                digest = (digest, bool(image.packed_file))
+            if digest is None or digest not in pixel_hashes:
+                pixel_hash = texture_packer.pixel_digest(image)
+                if digest is not None:
+                    pixel_hashes[digest] = pixel_hash
+            else:
+                pixel_hash = pixel_hashes[digest]
+            by_content.setdefault(pixel_hash, []).append(image)
+
+        for same in by_content.values():
+            if len(same) < 2:
+                continue
+            # Keep the most used copy, then the first by name, so reruns pick the same one
+            canonical = min(same, key=lambda image: (-image.users, image.name))
+            for image in same:
+                if image == canonical:
+                    continue
+                for node in texture_nodes[image.as_pointer()].values():
+                    node.image = canonical
+                    remapped += 1
+                merged += 1
+                if image.users == 0:
+                    freed_bytes += image_bytes(image)
+                    duplicates.append(image)
+
+    bpy.data.batch_remove(duplicates)
+    return merged, remapped, freed_bytes
+
+# Custom property stamped on visited materials and nested node groups with the
+# fingerprint of their node tree
+FINGERPRINT_PROP = "phlanka_fingerprint"
+
+# Hash the node types, group names and link topology of a node tree. When a
+# list is passed as groups, the node trees of its group nodes are appended to it
+# in the same pass.
+def fingerprint_node_tree(node_tree, salt="", groups=None):
+    node_keys = []
+    for node in node_tree.nodes:
+        group_name = ""
+        if node.type == 'GROUP' and node.node_tree:
+            group_name = node.node_tree.name
+            if groups is not None:
+                groups.append(node.node_tree)
+        node_keys.append((node.name, node.type, group_name))
+    node_keys.sort()
+    link_keys = sorted(
+        (link.from_node.name, link.from_socket.identifier, link.to_node.name, link.to_socket.identifier)
+        for link in node_tree.links
+    )
+    return hashlib.sha1(repr((salt, node_keys, link_keys)).encode()).hexdigest()
+
+# Build an index of a material's group nodes keyed by node_tree name in one pass
+def index_material_nodes(node_tree):
+    group_index = {}
+    output_node = None
+
+    for node in node_tree.nodes:
+        if node.type == 'GROUP':
+            if node.node_tree:
+                group_index.setdefault(node.node_tree.name, []).append(node)
+        elif node.type == 'OUTPUT_MATERIAL' and output_node is None:
+            output_node = node
+
+    return group_index, output_node
+
+# Work out which nodes of a node tree to replace and with which Phlanka group,
+# without modifying anything. Returns a list of (node, new group name). Groups
+# whose node_tree pointer is in keep are never replaced by the output fallback.
+def plan_material_nodes(node_tree, replacement_rules, available_groups, keep=frozenset()):
+    group_index, output_node = index_material_nodes(node_tree)
+    replacements = []
+    planned = set()
+
+    # Handle specific node replacements first; rules are resolved once per distinct node_tree
+    for tree_name, group_nodes in group_index.items():
+        new_group_name = replacement_rules.target_for(tree_name)
+        if new_group_name not in available_groups:
+            continue
+        planned.add(tree_name)
+        for node in group_nodes:
+            replacements.append((node, new_group_name))
+
+    # Also handle the special case of nodes connected to Material Output
+    # (in case they're not matched by a rule but should still be replaced)
+    fallback_target = replacement_rules.fallback_target
+    if fallback_target in available_groups and output_node and output_node.inputs[0].is_linked:
+        main_node = output_node.inputs[0].links[0].from_node
+        # Only replace if it's a GROUP node and not already handled
+        if main_node.type == 'GROUP' and main_node.node_tree:
+            name = main_node.node_tree.name
+            if (name not in replacement_rules.fallback_excluded and name not in planned
+                    and main_node.node_tree.as_pointer() not in keep):
+                replacements.append((main_node, fallback_target))
+
+    return replacements
+
+# Execute planned replacements on a node tree, returns the number of nodes replaced
+def apply_replacements(node_tree, replacements, loaded_groups, profile=None):
+    nodes = node_tree.nodes
+    links = node_tree.links
+    for node, new_group_name in replacements:
+        replace_single_node(node, loaded_groups[new_group_name], nodes, links, profile)
+    return len(replacements)
+
+# Replace the FPv3 nodes of a single material, returns the number of nodes replaced
+def convert_material(material, loaded_groups, profile=None, replacement_rules=None):
+    if replacement_rules is None:
+        replacement_rules = get_replacement_rules()
+    available_groups = {name for name, group in loaded_groups.items() if group}
+    replacements = plan_material_nodes(material.node_tree, replacement_rules, available_groups)
+    return apply_replacements(material.node_tree, replacements, loaded_groups, profile)
+
+# Read-only description of what a conversion would do: one entry of
+# (owner, node_tree, fingerprint, [(node, new group name), ...]) per material or
+# nested node group to touch. The owner is the ID the fingerprint is stamped on,
+# the material itself or the node group.
+class ConversionPlan:
+    def __init__(self, replacement_rules, salt, available_groups):
+        self.replacement_rules = replacement_rules
+        self.salt = salt
+        self.available_groups = available_groups
+        self.entries = []
+        self.visited = 0
+        self.unchanged = 0
+        self.changed = 0
+        # Nested group trees already planned this run, by pointer, so a group
+        # shared by many materials is walked and rewritten once. The value says
+        # whether the group wraps FPv3 or Phlanka groups at any depth.
+        self.group_trees = {}
+        # Pointers of those wrapper groups, which the output fallback must keep
+        self.wrappers = set()
+        self.group_reuse = 0
+        self.max_depth = 0
+        self.cycles = 0
+
+    def add(self, material, keep=True):
+        """Plan one material and the user groups nested in it without modifying them, returns the new entries.
+        With keep False they aren't added to entries, for callers that apply them right away."""
+        # Linked materials can't be edited (or stamped) from this file
+        if not material.node_tree or material.library:
+            return []
+        self.visited += 1
+
+        # Nested groups carry their own fingerprint, as they can be edited without
+        # touching the material. They are planned first, so the material's output
+        # fallback knows which groups wrap FPv3 or Phlanka nodes.
+        entries = []
+        nested = []
+        fingerprint = fingerprint_node_tree(material.node_tree, self.salt, nested)
+        group_entries = []
+        self.add_groups(nested, group_entries, 1, set())
+
+        # Skip materials untouched since the last run
+        stored = material.get(FINGERPRINT_PROP)
+        if stored == fingerprint:
+            self.unchanged += 1
+        else:
+            if stored is not None:
+                self.changed += 1
+            # Materials with nothing to replace are kept so apply can stamp them
+            entries.append((material, material.node_tree, fingerprint,
+                            plan_material_nodes(material.node_tree, self.replacement_rules, self.available_groups,
+                                                self.wrappers)))
+
+        entries.extend(group_entries)
+        if keep:
+            self.entries.extend(entries)
+        return entries
+
+    def is_ours(self, node_tree):
+        """FPv3 groups the rules replace and the Phlanka groups replacing them, local or linked"""
+        return (node_tree.get(ASSET_STAMP_PROP) is not None
+                or base_name(node_tree.name) in self.replacement_rules.targets
+                or self.replacement_rules.target_for(node_tree.name) is not None)
+
+    def is_user_group(self, node_tree):
+        """Groups to descend into: local ones that are neither replaced (FPv3) nor replacements (Phlanka)"""
+        return not (node_tree.library or self.is_ours(node_tree))
+
+    def add_groups(self, node_trees, entries, depth, path):
+        """Plan the user group trees referenced at the given nesting depth, innermost first.
+        Returns whether any of the trees is, or wraps, an FPv3 or Phlanka group."""
+        wraps = False
+        for node_tree in node_trees:
+            if not self.is_user_group(node_tree):
+                wraps = wraps or self.is_ours(node_tree)
+                continue
+            pointer = node_tree.as_pointer()
+            # Blender refuses recursive groups, but a damaged or hand-edited file may still contain one
+            if pointer in path:
+                self.cycles += 1
+                print(f"PhlankaFortnite: node group {node_tree.name} contains itself, not descending into it again")
+                continue
+            if pointer in self.group_trees:
+                self.group_reuse += 1
+                wraps = wraps or self.group_trees[pointer]
                 continue
-                
-            processed_materials.add(material.name)
-            
-            nodes = material.node_tree.nodes
-            links = material.node_tree.links
-
-            # Handle specific node replacements first
-            for new_group_name, old_group_name in replacements.items():
-                if loaded_groups[new_group_name]:
-                    # Find all nodes of the specified type
-                    nodes_to_replace = [n for n in nodes if n.type == 'GROUP' and 
-                                       n.node_tree and n.node_tree.name == old_group_name]
-                    
-                    for node in nodes_to_replace:
-                        replace_single_node(node, loaded_groups[new_group_name], nodes, links)
-                        
-            # Also handle the special case of nodes connected to Material Output
-            # (in case they're not FPv3 Material but should still be replaced)
-            if loaded_groups["PhlankaFortnite"]:
-                output_node = next((n for n in nodes if n.type == 'OUTPUT_MATERIAL'), None)
-                if output_node and output_node.inputs[0].is_linked:
-                    main_node = output_node.inputs[0].links[0].from_node
-                    # Only replace if it's a GROUP node and not already handled
-                    if main_node.type == 'GROUP' and main_node.node_tree:
-                        # Skip if it's already one of our nodes or if it's a specific node that should be replaced with something else
-                        excluded_nodes = ["PhlankaFortnite", "PhlankaGlassFortnite", "PhlankaLayersFortnite", 
-                                         "FPv3 Glass", "FPv3 Layer"]
-                        if main_node.node_tree.name not in excluded_nodes:
-                            replace_single_node(main_node, loaded_groups["PhlankaFortnite"], nodes, links)
+            self.group_trees[pointer] = False
+            self.max_depth = max(self.max_depth, depth)
+
+            nested = []
+            fingerprint = fingerprint_node_tree(node_tree, self.salt, nested)
+            path.add(pointer)
+            inner = self.add_groups(nested, entries, depth + 1, path)
+            path.discard(pointer)
+
+            # A wrapper is converted inside, so it must not also be swapped out whole
+            self.group_trees[pointer] = inner
+            if inner:
+                self.wrappers.add(pointer)
+            wraps = wraps or inner
+
+            if node_tree.get(FINGERPRINT_PROP) != fingerprint:
+                entries.append((node_tree, node_tree, fingerprint,
+                                plan_material_nodes(node_tree, self.replacement_rules, self.available_groups,
+                                                    self.wrappers)))
+        return wraps
+
+    def node_count(self):
+        return sum(len(replacements) for owner, node_tree, fingerprint, replacements in self.entries)
+
+    def material_count(self):
+        return sum(1 for owner, node_tree, fingerprint, replacements in self.entries
+                   if replacements and not isinstance(owner, bpy.types.NodeTree))
+
+    def group_count(self):
+        return sum(1 for owner, node_tree, fingerprint, replacements in self.entries
+                   if replacements and isinstance(owner, bpy.types.NodeTree))
+
+    def summary(self):
+        return (f"{self.node_count()} nodes in {self.material_count()} materials and {self.group_count()} "
+                f"nested node groups would be replaced ({self.unchanged} materials unchanged since last run)")
+
+# Function to replace the node connected to Material Output
+def replace_node_group(context, stats=None, materials=None):
+    # Instrumentation is opt-in so normal runs pay nothing for it
+    if profiling.is_enabled(context):
+        return profiling.run_profiled(context, lambda profile: convert_all_materials(context, stats, profile, materials))
+    return convert_all_materials(context, stats, None, materials)
+
+# Which materials a conversion covers
+CONVERSION_SCOPES = [
+    ('FILE', "Whole File", "Every material in the file"),
+    ('SELECTED', "Selected Objects", "Materials of the selected objects"),
+    ('COLLECTION', "Active Collection", "Materials of every object in the active collection and its children"),
+    ('ACTIVE_MATERIAL', "Active Material", "The material shown in the Node Editor"),
+]
+
+# Materials in a conversion scope, collected in one pass that never leaves the scope
+def collect_scope_materials(context, scope):
+    if scope == 'FILE':
+        return list(bpy.data.materials)
+
+    if scope == 'ACTIVE_MATERIAL':
+        space = context.space_data
+        material = space.id if space and space.type == 'NODE_EDITOR' else None
+        if not isinstance(material, bpy.types.Material):
+            obj = context.active_object
+            material = obj.active_material if obj else None
+        return [material] if material else []
+
+    if scope == 'SELECTED':
+        # The Outliner selection also covers objects that can't be selected in the viewport
+        selected_ids = getattr(context, "selected_ids", None)
+        if selected_ids is not None:
+            objects = [data for data in selected_ids if isinstance(data, bpy.types.Object)]
+        else:
+            objects = context.selected_objects
+    else:
+        collection = context.collection
+        objects = collection.all_objects if collection else []
+
+    materials = {}
+    for obj in objects:
+        for slot in obj.material_slots:
+            if slot.material:
+                materials.setdefault(slot.material.as_pointer(), slot.material)
+    return list(materials.values())
+
+# Fingerprints are salted with the asset version and the rules, so updating
+# either re-checks every material once
+def conversion_salt(assets_path, replacement_rules):
+    return get_asset_hash(assets_path) + replacement_rules.digest
+
+# Plan a conversion of every material without touching any data (dry run)
+def plan_node_group_replacement(context):
+    assets_path = get_assets_path()
+    if not os.path.exists(assets_path):
+        return None
+
+    # Loading the groups would modify the file, so assume every shipped group is available
+    replacement_rules = get_replacement_rules(assets_path)
+    plan = ConversionPlan(replacement_rules, conversion_salt(assets_path, replacement_rules), set(replacement_rules.targets))
+    for material in bpy.data.materials:
+        plan.add(material)
+    return plan
+
+# Applies a ConversionPlan; materials are fed in one at a time so the same
+# pass can run in a single loop or spread over modal timer ticks
+class ConversionRun:
+    def __init__(self, loaded_groups, replacement_rules, salt, profile=None):
+        # Lookup keys rather than references, an undo between modal ticks frees the IDs
+        self.group_keys = {name: (group.name, group.library.filepath) if group.library else group.name
+                           for name, group in loaded_groups.items() if group}
+        self.profile = profile
+        self.plan = ConversionPlan(replacement_rules, salt, {name for name, group in loaded_groups.items() if group})
+        self.converted = 0
+        self.groups_converted = 0
+        # Names rather than references, the run may span several modal ticks
+        self.converted_materials = []
+        self.converted_groups = []
+        self.merged = 0
+        self.purged = None
+        self.deduplicated = None
+        self.packed = None
+        self.pack_error = None
+
+    def plan_material(self, material, keep=True):
+        entries = self.plan.add(material, keep)
+        if self.profile:
+            self.profile.counts["materials_visited"] = self.plan.visited
+        return entries
+
+    def loaded_groups(self):
+        """The Phlanka groups by target name, looked up again so they are valid right now"""
+        return {name: bpy.data.node_groups.get(key) for name, key in self.group_keys.items()}
+
+    def apply(self, entry, loaded_groups):
+        """Execute one planned material or nested group and stamp its fingerprint"""
+        owner, node_tree, fingerprint, replacements = entry
+        if replacements:
+            # Undone or deleted since the run started, left for the next run
+            if any(loaded_groups.get(name) is None for node, name in replacements):
+                return
+            apply_replacements(node_tree, replacements, loaded_groups, self.profile)
+            if isinstance(owner, bpy.types.NodeTree):
+                self.groups_converted += 1
+                self.converted_groups.append(owner.name)
+            else:
+                self.converted += 1
+                self.converted_materials.append(owner.name)
+            fingerprint = fingerprint_node_tree(node_tree, self.plan.salt)
+        owner[FINGERPRINT_PROP] = fingerprint
+
+    def apply_plan(self):
+        loaded_groups = self.loaded_groups()
+        for entry in self.plan.entries:
+            self.apply(entry, loaded_groups)
+
+    def process(self, material):
+        """Plan and apply a single material and the groups nested in it, keeping no
+        node references afterwards, as they dangle after an undo between modal ticks"""
+        loaded_groups = self.loaded_groups()
+        for entry in self.plan_material(material, keep=False):
+            self.apply(entry, loaded_groups)
+
+    def prepare(self, whole_file=True):
+        """Pre-conversion stages, run once before the first material is planned"""
+        prefs = get_preferences()
+        # Merging remaps object slots across the file, so scoped runs leave it out
+        if whole_file and prefs and prefs.merge_duplicate_materials:
+            self.merged = self.timed("merge_materials", merge_duplicate_materials)
+
+    def timed(self, phase, stage, *args):
+        """Run a pre- or post-conversion stage, timing it into its own profile phase"""
+        if not self.profile:
+            return stage(*args)
+        started = perf_counter()
+        try:
+            return stage(*args)
+        finally:
+            self.profile.timings[phase] += perf_counter() - started
+
+    def finish(self):
+        """Post-conversion stages, run once after the last material"""
+        prefs = get_preferences()
+        # Before purging and packing, so both see the merged images
+        if (self.converted_materials or self.converted_groups) and prefs and prefs.merge_duplicate_images:
+            node_trees = [bpy.data.materials[name].node_tree for name in self.converted_materials if name in bpy.data.materials]
+            node_trees += [bpy.data.node_groups[name] for name in self.converted_groups if name in bpy.data.node_groups]
+            self.deduplicated = self.timed("merge_images", merge_duplicate_images,
+                                           node_trees, phlanka_group_pointers(self.plan.replacement_rules))
+        if self.converted and prefs and prefs.purge_after_conversion:
+            self.purged = self.timed("purge", purge_orphaned_fpv3_data)
+        if self.converted_materials and prefs and prefs.pack_after_conversion:
+            materials = [bpy.data.materials[name] for name in self.converted_materials if name in bpy.data.materials]
+            try:
+                self.packed = self.timed("pack_textures", pack_dayz_textures, materials, self.plan.replacement_rules)
+            except (OSError, RuntimeError) as e:
+                self.pack_error = str(e)
+
+    def stats(self):
+        # Skipped covers unchanged materials and ones with nothing to replace,
+        # e.g. already using the Phlanka groups
+        stats = {
+            "converted": self.converted,
+            "skipped": self.plan.visited - self.converted,
+            "changed": self.plan.changed,
+        }
+        if self.plan.group_trees:
+            stats["groups"] = {
+                "visited": len(self.plan.group_trees),
+                "converted": self.groups_converted,
+                "reused": self.plan.group_reuse,
+                "max_depth": self.plan.max_depth,
+                "cycles": self.plan.cycles,
+            }
+        if self.merged:
+            stats["merged"] = self.merged
+        if self.purged:
+            stats["purged"] = self.purged
+        if self.deduplicated and self.deduplicated[0]:
+            stats["deduplicated"] = self.deduplicated
+        if self.packed:
+            stats["packed"] = self.packed
+        if self.pack_error:
+            stats["pack_error"] = self.pack_error
+        return stats
+
+# Raised when a conversion can't start, with a message for the user
+class ConversionError(RuntimeError):
+    pass
+
+# Load the Phlanka groups and set up a conversion pass, raises ConversionError if conversion can't run
+def begin_conversion(profile=None):
+    # Load the node groups from Assets.blend
+    assets_path = get_assets_path()
+    
+    if not os.path.exists(assets_path):
+        raise ConversionError("Assets.blend not found!")
+
+    try:
+        replacement_rules = get_replacement_rules(assets_path)
+    except (OSError, ValueError, KeyError, re.error) as e:
+        raise ConversionError(f"Invalid replacement rules: {e}") from e
+
+    # Reuse the groups appended by an earlier run, only reading the library when needed
+    if profile:
+        started = perf_counter()
+    loaded_groups = load_phlanka_groups(assets_path, use_linked_assets(), replacement_rules.targets)
+    if profile:
+        profile.timings["load_assets"] += perf_counter() - started
+    if not any(loaded_groups.values()):
+        raise ConversionError("Required node groups not found in Assets.blend!")
+
+    # Socket plans hold node_tree pointers, which are only valid for this run
+    _socket_plans.clear()
+
+    return ConversionRun(loaded_groups, replacement_rules, conversion_salt(assets_path, replacement_rules), profile)
+
+# Convert every material in the file, or just the given ones, recording timings
+# into profile when given. Raises ConversionError if conversion can't run.
+def convert_all_materials(context, stats=None, profile=None, materials=None):
+    run = begin_conversion(profile)
+
+    # Plan every material in one read-only pass, then apply the plan in one tight loop
+    run.prepare(whole_file=materials is None)
+    for material in bpy.data.materials if materials is None else materials:
+        run.plan_material(material)
+    run.apply_plan()
+    run.finish()
+
+    if stats is not None:
+        stats.update(run.stats())
 
     return {'FINISHED'}
 
+# Classify a socket's default value for copying: (socket type, 'SCALAR' or array
+# length), or None. The type is part of it, as a float can't be assigned to an
+# int or boolean socket.
+def socket_value_kind(socket):
+    value = getattr(socket, "default_value", None)
+    if isinstance(value, (bool, int, float)):
+        return socket.type, 'SCALAR'
+    if value is not None and not isinstance(value, str) and hasattr(value, "__len__"):
+        return socket.type, len(value)
+    return None
+
+# Socket mapping between two node groups, compiled once and replayed for every node
+class SocketPlan:
+    def __init__(self, old_node, new_node):
+        # (source index, target index, copy default value) for every mapped input
+        self.inputs = []
+        # (source index, target index) for every mapped output
+        self.outputs = []
+        self.unmapped_inputs = []
+        self.unmapped_outputs = []
+
+        for src_index, dst_index, src, dst in self.match_sockets(old_node.inputs, new_node.inputs, self.unmapped_inputs):
+            kind = socket_value_kind(src)
+            self.inputs.append((src_index, dst_index, kind is not None and kind == socket_value_kind(dst)))
+
+        for src_index, dst_index, src, dst in self.match_sockets(old_node.outputs, new_node.outputs, self.unmapped_outputs):
+            self.outputs.append((src_index, dst_index))
+
+    @staticmethod
+    def match_sockets(sources, targets, unmapped):
+        """Match sockets by name and type, falling back to position"""
+        # Group socket identifiers are generated per group, so the name is the stable key
+        by_name = {}
+        for index, socket in enumerate(targets):
+            by_name.setdefault((socket.name, socket.type), []).append(index)
+
+        # Every exact match first, so the position fallback can't take a slot a later socket matches by name
+        used = set()
+        mapped = {}
+        for src_index, src in enumerate(sources):
+            dst_index = next((i for i in by_name.get((src.name, src.type), ()) if i not in used), None)
+            if dst_index is not None:
+                used.add(dst_index)
+                mapped[src_index] = dst_index
+
+        matches = []
+        for src_index, src in enumerate(sources):
+            dst_index = mapped.get(src_index)
+            if dst_index is None and src_index < len(targets) and src_index not in used:
+                dst_index = src_index
+                used.add(dst_index)
+            if dst_index is None:
+                unmapped.append(src.name)
+                continue
+            matches.append((src_index, dst_index, src, targets[dst_index]))
+        return matches
+
+# Compiled plans keyed by (source node_tree, target node_tree) pointers, reset every run
+_socket_plans = {}
+
+def get_socket_plan(old_node, new_node):
+    key = (old_node.node_tree.as_pointer(), new_node.node_tree.as_pointer())
+    plan = _socket_plans.get(key)
+    if plan is None:
+        plan = _socket_plans[key] = SocketPlan(old_node, new_node)
+        if plan.unmapped_inputs or plan.unmapped_outputs:
+            print(f"PhlankaFortnite: {old_node.node_tree.name} -> {new_node.node_tree.name} "
+                  f"unmapped inputs {plan.unmapped_inputs}, outputs {plan.unmapped_outputs}")
+    return plan
+
 # Helper function to replace a single node
-def replace_single_node(old_node, new_group, nodes, links):
+def replace_single_node(old_node, new_group, nodes, links, profile=None):
+    if profile:
+        started = perf_counter()
+
     # Create a new node
     new_node = nodes.new(type='ShaderNodeGroup')
     new_node.node_tree = new_group
     new_node.location = old_node.location
 
+    if profile:
+        created = perf_counter()
+        profile.timings["node_creation"] += created - started
+
+    plan = get_socket_plan(old_node, new_node)
+    old_inputs, new_inputs = old_node.inputs, new_node.inputs
+    old_outputs, new_outputs = old_node.outputs, new_node.outputs
+    links_created = values_copied = 0
+
     # Transfer connections and default values
-    for i, input_socket in enumerate(old_node.inputs):
-        if i < len(new_node.inputs):
-            if input_socket.is_linked:
-                for link in input_socket.links:
-                    links.new(link.from_socket, new_node.inputs[i])
-            else:
-                try:
-                    # Get the expected dimensions for the target socket
-                    target_socket = new_node.inputs[i]
-                    source_value = input_socket.default_value
-                    
-                    # Check if both are single values (float/int)
-                    if isinstance(source_value, (float, int)) and not hasattr(target_socket.default_value, "__len__"):
-                        target_socket.default_value = source_value
-                    # Check if both are vectors/colors with same dimensions
-                    elif hasattr(source_value, "__len__") and hasattr(target_socket.default_value, "__len__"):
-                        if len(source_value) == len(target_socket.default_value):
-                            target_socket.default_value = source_value
-                    # Skip if types don't match
-                    else:
-                        continue
-                except (AttributeError, ValueError, TypeError):
-                    # Skip any errors during value assignment
-                    continue
+    for src_index, dst_index, copy_value in plan.inputs:
+        input_socket = old_inputs[src_index]
+        if input_socket.is_linked:
+            for link in input_socket.links:
+                links.new(link.from_socket, new_inputs[dst_index])
+                links_created += 1
+        elif copy_value:
+            new_inputs[dst_index].default_value = input_socket.default_value
+            values_copied += 1
 
     # Transfer the output connections
-    for i, output_socket in enumerate(old_node.outputs):
-        if i < len(new_node.outputs):
-            if output_socket.is_linked:
-                for link in output_socket.links:
-                    links.new(new_node.outputs[i], link.to_socket)
+    for src_index, dst_index in plan.outputs:
+        output_socket = old_outputs[src_index]
+        if output_socket.is_linked:
+            for link in output_socket.links:
+                links.new(new_outputs[dst_index], link.to_socket)
+                links_created += 1
+
+    if profile:
+        rewired = perf_counter()
+        profile.timings["link_rewiring"] += rewired - created
 
     # Remove the old node
     nodes.remove(old_node)
 
+    if profile:
+        profile.timings["node_removal"] += perf_counter() - rewired
+        profile.counts["nodes_replaced"] += 1
+        profile.counts["links_created"] += links_created
+        profile.counts["values_copied"] += values_copied
+
+# Report the outcome of a conversion run on an operator
+def report_conversion(operator, stats):
+    operator.report({'INFO'}, "Converted {converted} materials, skipped {skipped} ({changed} changed since last run)".format(**stats))
+    groups = stats.get("groups")
+    if groups:
+        operator.report({'INFO'}, "Converted {converted} of {visited} nested node groups, nested up to {max_depth} "
+                                  "deep, {reused} shared references reused".format(**groups))
+        if groups["cycles"]:
+            operator.report({'WARNING'}, f"Skipped {groups['cycles']} recursive node group references")
+    if stats.get("merged"):
+        operator.report({'INFO'}, f"Merged {stats['merged']} duplicate materials before converting")
+    if stats.get("deduplicated"):
+        report_image_merge(operator, *stats["deduplicated"])
+    if stats.get("purged"):
+        report_purge(operator, *stats["purged"])
+    if stats.get("packed"):
+        report_packing(operator, *stats["packed"])
+    if stats.get("pack_error"):
+        operator.report({'WARNING'}, f"Could not pack DayZ textures: {stats['pack_error']}")
+
+# Report the outcome of purging unused FPv3 data on an operator
+def report_purge(operator, groups, images, freed_bytes):
+    operator.report({'INFO'}, f"Purged {groups} unused FPv3 node groups and {images} images "
+                              f"({freed_bytes / (1024 * 1024):.1f} MB of image data)")
+
+# Report the outcome of merging duplicate images on an operator
+def report_image_merge(operator, merged, remapped, freed_bytes):
+    operator.report({'INFO'}, f"Merged {merged} duplicate images, {remapped} texture nodes remapped "
+                              f"({freed_bytes / (1024 * 1024):.1f} MB of image data freed)")
+
+# Report the outcome of packing DayZ textures on an operator
+def report_packing(operator, files, materials):
+    operator.report({'INFO'}, f"Packed {files} DayZ textures for {materials} materials into {get_texture_output_dir()}")
+
 # UI Panel in Material Node Editor
 class PHLANKA_PT_MaterialPanel(bpy.types.Panel):
     bl_label = "Phlanka Fortnite"
@@ -141,7 +1001,31 @@ class PHLANKA_PT_MaterialPanel(bpy.types.Panel):
 
     def draw(self, context):
         layout = self.layout
-        layout.operator("phlanka.convert_to_dayz")
+        if conversion_progress is not None:
+            done, total = conversion_progress
+            layout.label(text=f"Converting {done}/{total} materials (Esc to cancel)", icon='TIME')
+        else:
+            row = layout.row(align=True)
+            row.operator("phlanka.convert_to_dayz")
+            row.operator("phlanka.preview_conversion", text="", icon='VIEWZOOM')
+            layout.operator("phlanka.convert_to_dayz", text="Convert Active Material").scope = 'ACTIVE_MATERIAL'
+            layout.operator("phlanka.merge_duplicate_materials", icon='MATERIAL')
+            layout.operator("phlanka.merge_duplicate_images", icon='IMAGE_DATA')
+            layout.operator("phlanka.purge_fpv3", icon='TRASH')
+            layout.operator("phlanka.pack_dayz_textures", icon='TEXTURE')
+        profiling.draw_profile(layout, context)
+        cache = get_content_cache()
+        if cache:
+            content_cache.draw_stats(layout, cache)
+        
+        # Asset mode and relinking
+        prefs = get_preferences()
+        if prefs:
+            box = layout.box()
+            box.label(text="Assets")
+            box.prop(prefs, "asset_mode", expand=True)
+            if prefs.asset_mode == 'LINK':
+                box.operator("phlanka.relink_assets")
         
         # Add a separator and update section
         layout.separator()
@@ -150,25 +1034,358 @@ class PHLANKA_PT_MaterialPanel(bpy.types.Panel):
         box.operator("phlanka.check_for_updates", text="Check for Updates")
 
 
+# Where the Phlanka node groups come from
+class PhlankaPreferences(bpy.types.AddonPreferences):
+    bl_idname = __name__
+
+    asset_mode: bpy.props.EnumProperty(
+        name="Asset Mode",
+        description="How converted files get the Phlanka node groups",
+        items=[
+            ('APPEND', "Append", "Copy the node groups into every converted file"),
+            ('LINK', "Link", "Link the node groups from a shared Assets.blend, so files stay small and pick up new versions"),
+        ],
+        default='APPEND',
+    )
+    merge_duplicate_materials: bpy.props.BoolProperty(
+        name="Merge Duplicate Materials",
+        description="Merge structurally identical copies of a material (M_Foo, M_Foo.001, ...) before converting",
+        default=False,
+    )
+    purge_after_conversion: bpy.props.BoolProperty(
+        name="Purge After Conversion",
+        description="Remove FPv3 node groups, subgroups and images that are left unused after converting",
+        default=False,
+    )
+    merge_duplicate_images: bpy.props.BoolProperty(
+        name="Merge Duplicate Images",
+        description="After converting, point texture nodes feeding the Phlanka groups at one copy of each identical image",
+        default=False,
+    )
+    pack_after_conversion: bpy.props.BoolProperty(
+        name="Pack DayZ Textures After Conversion",
+        description="Write the _co, _nohq, _smdi and _as maps of every converted material",
+        default=False,
+    )
+    texture_output_dir: bpy.props.StringProperty(
+        name="DayZ Texture Folder",
+        description="Where packed DayZ textures are written; relative paths start at the .blend file",
+        default=DEFAULT_TEXTURE_DIR,
+        subtype='DIR_PATH',
+    )
+    use_cache: bpy.props.BoolProperty(
+        name="Use Cache",
+        description="Reuse packed DayZ textures from earlier runs, in any .blend file",
+        default=True,
+    )
+    cache_dir: bpy.props.StringProperty(
+        name="Cache Folder",
+        description="Where cached results are kept; leave empty for the per-user default",
+        subtype='DIR_PATH',
+    )
+    cache_max_mb: bpy.props.IntProperty(
+        name="Cache Size (MB)",
+        description="Least recently used entries are removed once the cache grows past this",
+        default=content_cache.DEFAULT_MAX_MB,
+        min=16,
+    )
+    shared_assets_path: bpy.props.StringProperty(
+        name="Shared Assets.blend",
+        description="Versioned Assets.blend shared by the project; leave empty to use the one bundled with the addon",
+        subtype='FILE_PATH',
+    )
+
+    def draw(self, context):
+        layout = self.layout
+        layout.prop(self, "asset_mode", expand=True)
+        layout.prop(self, "shared_assets_path")
+        layout.prop(self, "merge_duplicate_materials")
+        layout.prop(self, "purge_after_conversion")
+        layout.prop(self, "merge_duplicate_images")
+        layout.prop(self, "pack_after_conversion")
+        layout.prop(self, "texture_output_dir")
+        layout.prop(self, "use_cache")
+        if self.use_cache:
+            layout.prop(self, "cache_dir")
+            layout.prop(self, "cache_max_mb")
+
+
+# Switch the current file over to the groups linked from the configured Assets.blend
+class PHLANKA_OT_RelinkAssets(bpy.types.Operator):
+    bl_idname = "phlanka.relink_assets"
+    bl_label = "Relink Phlanka Assets"
+    bl_description = "Link the Phlanka node groups from the configured Assets.blend and move every user of older or appended copies over to them"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        assets_path = get_assets_path()
+        if not os.path.exists(assets_path):
+            self.report({'ERROR'}, f"Assets.blend not found: {assets_path}")
+            return {'CANCELLED'}
+        try:
+            replaced = relink_phlanka_groups(assets_path)
+        except (OSError, ValueError, KeyError, re.error) as e:
+            self.report({'ERROR'}, f"Invalid replacement rules: {e}")
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"Relinked Phlanka groups from {os.path.basename(assets_path)}, {replaced} old groups replaced")
+        return {'FINISHED'}
+
+
+# Merge duplicate materials on their own
+class PHLANKA_OT_MergeDuplicateMaterials(bpy.types.Operator):
+    bl_idname = "phlanka.merge_duplicate_materials"
+    bl_label = "Merge Duplicate Materials"
+    bl_description = "Merge structurally identical copies of a material (M_Foo, M_Foo.001, ...) into one"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        merged = merge_duplicate_materials()
+        self.report({'INFO'}, f"Merged {merged} duplicate materials")
+        return {'FINISHED'}
+
+
+# Merge identical images feeding the Phlanka groups anywhere in the file
+class PHLANKA_OT_MergeDuplicateImages(bpy.types.Operator):
+    bl_idname = "phlanka.merge_duplicate_images"
+    bl_label = "Merge Duplicate Images"
+    bl_description = "Point image texture nodes feeding the Phlanka groups at one copy of each identical image"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        try:
+            replacement_rules = get_replacement_rules()
+        except (OSError, ValueError, KeyError, re.error) as e:
+            self.report({'ERROR'}, f"Invalid replacement rules: {e}")
+            return {'CANCELLED'}
+        node_trees = [material.node_tree for material in bpy.data.materials if material.node_tree and not material.library]
+        node_trees += [group for group in bpy.data.node_groups if group.bl_idname == 'ShaderNodeTree' and not group.library]
+        report_image_merge(self, *merge_duplicate_images(node_trees, phlanka_group_pointers(replacement_rules)))
+        return {'FINISHED'}
+
+
+# Remove FPv3 data that no longer has any users
+class PHLANKA_OT_PurgeFPv3(bpy.types.Operator):
+    bl_idname = "phlanka.purge_fpv3"
+    bl_label = "Purge Unused FPv3 Data"
+    bl_description = "Remove FPv3 node groups, subgroups and images that nothing uses any more"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        try:
+            purged = purge_orphaned_fpv3_data()
+        except (OSError, ValueError, KeyError, re.error) as e:
+            self.report({'ERROR'}, f"Invalid replacement rules: {e}")
+            return {'CANCELLED'}
+        report_purge(self, *purged)
+        return {'FINISHED'}
+
+
+# Pack the DayZ maps of every material already using the Phlanka groups
+class PHLANKA_OT_PackDayZTextures(bpy.types.Operator):
+    bl_idname = "phlanka.pack_dayz_textures"
+    bl_label = "Pack DayZ Textures"
+    bl_description = "Write _co, _nohq, _smdi and _as maps from the images feeding each material's Phlanka group"
+    # Only writes image files, so there is nothing to undo in the .blend
+    bl_options = {'REGISTER'}
+
+    def execute(self, context):
+        try:
+            files, materials = pack_dayz_textures(bpy.data.materials, get_replacement_rules())
+        except (OSError, RuntimeError, ValueError, KeyError, re.error) as e:
+            self.report({'ERROR'}, f"Could not pack DayZ textures: {e}")
+            return {'CANCELLED'}
+        if not files:
+            self.report({'WARNING'}, "No image textures feed the Phlanka groups, nothing to pack")
+            return {'CANCELLED'}
+        report_packing(self, files, materials)
+        return {'FINISHED'}
+
+
+# Report what a conversion would do without changing anything
+class PHLANKA_OT_PreviewConversion(bpy.types.Operator):
+    bl_idname = "phlanka.preview_conversion"
+    bl_label = "Dry Run"
+    bl_description = "Report which nodes a conversion would replace without changing anything"
+    # Read-only, so no 'UNDO': a dry run never leaves an undo step behind
+    bl_options = {'REGISTER'}
+
+    def execute(self, context):
+        try:
+            plan = plan_node_group_replacement(context)
+        except (OSError, ValueError, KeyError, re.error) as e:
+            self.report({'ERROR'}, f"Invalid replacement rules: {e}")
+            return {'CANCELLED'}
+        if plan is None:
+            self.report({'ERROR'}, "Assets.blend not found!")
+            return {'CANCELLED'}
+        self.report({'INFO'}, plan.summary())
+        return {'FINISHED'}
+
+
+# Progress of the running modal conversion as (done, total), shown in the panel
+conversion_progress = None
+
+# Shared by the convert operators: execute converts in one go (scripts, redo),
+# invoke runs the same pass from a modal timer so the UI stays responsive
+class ConvertOperatorMixin:
+    time_budget: bpy.props.FloatProperty(
+        name="Time Budget",
+        description="Seconds of conversion work per UI update when run interactively",
+        default=0.05,
+        min=0.005,
+        max=1.0,
+    )
+    scope: bpy.props.EnumProperty(
+        name="Scope",
+        description="Which materials to convert",
+        items=CONVERSION_SCOPES,
+        default='FILE',
+    )
+
+    def execute(self, context):
+        materials = None
+        if self.scope != 'FILE':
+            materials = [material for material in collect_scope_materials(context, self.scope) if not material.library]
+            if not materials:
+                self.report({'WARNING'}, "No materials to convert in the chosen scope")
+                return {'CANCELLED'}
+
+        stats = {}
+        try:
+            result = replace_node_group(context, stats, materials)
+        except ConversionError as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+        if stats:
+            report_conversion(self, stats)
+        return result
+
+    def invoke(self, context, event):
+        global conversion_progress
+
+        if conversion_progress is not None:
+            self.report({'WARNING'}, "A conversion is already running")
+            return {'CANCELLED'}
+
+        # Keep names rather than ID references, which may dangle between ticks.
+        # A scope is checked before the groups are loaded, so an empty one leaves
+        # the file untouched; the whole file is listed after the merge below
+        pending = None
+        if self.scope != 'FILE':
+            pending = [material.name for material in collect_scope_materials(context, self.scope) if not material.library]
+            if not pending:
+                self.report({'WARNING'}, "No materials to convert in the chosen scope")
+                return {'CANCELLED'}
+
+        self._profile = profiling.ConversionProfile() if profiling.is_enabled(context) else None
+        try:
+            self._run = begin_conversion(self._profile)
+        except ConversionError as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+        self._run.prepare(whole_file=pending is None)
+        if self._profile:
+            self._profile.pause()
+
+        if pending is None:
+            pending = [material.name for material in bpy.data.materials if not material.library]
+        self._pending = pending
+        self._done = 0
+        conversion_progress = (0, len(self._pending))
+
+        wm = context.window_manager
+        wm.progress_begin(0, max(1, len(self._pending)))
+        self._timer = wm.event_timer_add(0.01, window=context.window)
+        wm.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        if event.type == 'ESC' and event.value == 'PRESS':
+            return self.finish(context, cancelled=True)
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+
+        # Whole materials only, so a cancel never leaves one half converted
+        if self._profile:
+            self._profile.resume()
+        deadline = perf_counter() + self.time_budget
+        materials = bpy.data.materials
+        while self._done < len(self._pending):
+            material = materials.get(self._pending[self._done])
+            self._done += 1
+            if material:
+                self._run.process(material)
+            if perf_counter() >= deadline:
+                break
+        if self._profile:
+            self._profile.pause()
+
+        if self._done >= len(self._pending):
+            return self.finish(context)
+        self.show_progress(context)
+        return {'RUNNING_MODAL'}
+
+    def cancel(self, context):
+        # Blender drops modal handlers on file load or window close; the file
+        # is going away, so only tear down without the post-conversion stages
+        self.teardown(context)
+
+    def show_progress(self, context):
+        global conversion_progress
+
+        conversion_progress = (self._done, len(self._pending))
+        context.window_manager.progress_update(self._done)
+        context.workspace.status_text_set(
+            f"Converting materials {self._done}/{len(self._pending)}, press Esc to cancel")
+        for area in context.screen.areas:
+            if area.type == 'NODE_EDITOR':
+                area.tag_redraw()
+
+    def teardown(self, context):
+        """Remove the timer, progress and status text"""
+        global conversion_progress
+
+        conversion_progress = None
+        wm = context.window_manager
+        wm.event_timer_remove(self._timer)
+        wm.progress_end()
+        if context.workspace:
+            context.workspace.status_text_set(None)
+        if context.screen:
+            for area in context.screen.areas:
+                if area.type == 'NODE_EDITOR':
+                    area.tag_redraw()
+
+    def finish(self, context, cancelled=False):
+        self.teardown(context)
+        if self._profile:
+            self._profile.resume()
+        self._run.finish()
+        if self._profile:
+            profiling.finish_profile(context, self._profile)
+
+        stats = self._run.stats()
+        if cancelled:
+            self.report({'WARNING'}, f"Conversion cancelled after {self._done} of {len(self._pending)} materials")
+        report_conversion(self, stats)
+        # Materials converted before a cancel are complete, so keep them as one undo step
+        return {'FINISHED'}
+
+
 # Operator for button
-class PHLANKA_OT_ConvertToDayZ(bpy.types.Operator):
+class PHLANKA_OT_ConvertToDayZ(ConvertOperatorMixin, bpy.types.Operator):
     bl_idname = "phlanka.convert_to_dayz"
     bl_label = "Convert to DayZ Textures"
     bl_description = "Replace the main material node with PhlankaFortnite"
-    
-    def execute(self, context):
-        return replace_node_group(context)
+    bl_options = {'REGISTER', 'UNDO'}
 
 
 # Outliner right-click menu operator
-class PHLANKA_OT_OutlinerConvertToDayZ(bpy.types.Operator):
+class PHLANKA_OT_OutlinerConvertToDayZ(ConvertOperatorMixin, bpy.types.Operator):
     bl_idname = "phlanka.outliner_convert_to_dayz"
     bl_label = "Convert to DayZ Textures"
-    bl_description = "Convert all materials in the scene to DayZ textures"
+    bl_description = "Convert the materials of the selected objects, the active collection or the whole file to DayZ textures"
     bl_options = {'REGISTER', 'UNDO'}
-    
-    def execute(self, context):
-        return replace_node_group(context)
 
 
 # Function to add the menu item to the outliner context menu
@@ -185,7 +1402,10 @@ class PHLANKA_MT_FortniteMenu(bpy.types.Menu):
     
     def draw(self, context):
         layout = self.layout
-        layout.operator("phlanka.outliner_convert_to_dayz", text="DayZ Texture Convert")
+        layout.operator("phlanka.outliner_convert_to_dayz", text="DayZ Texture Convert Selected").scope = 'SELECTED'
+        layout.operator("phlanka.outliner_convert_to_dayz", text="DayZ Texture Convert Collection").scope = 'COLLECTION'
+        layout.operator("phlanka.outliner_convert_to_dayz", text="DayZ Texture Convert All").scope = 'FILE'
+        layout.operator("phlanka.purge_fpv3", text="Purge Unused FPv3 Data")
 
 
 # Register and Unregister
@@ -193,6 +1413,13 @@ classes = [
     PHLANKA_PT_MaterialPanel, 
     PHLANKA_OT_ConvertToDayZ,
     PHLANKA_OT_OutlinerConvertToDayZ,
+    PHLANKA_OT_PreviewConversion,
+    PHLANKA_OT_RelinkAssets,
+    PHLANKA_OT_PurgeFPv3,
+    PHLANKA_OT_PackDayZTextures,
+    PHLANKA_OT_MergeDuplicateMaterials,
+    PHLANKA_OT_MergeDuplicateImages,
+    PhlankaPreferences,
     PHLANKA_MT_FortniteMenu
 ]
 
@@ -203,6 +1430,9 @@ def register():
     # Add the menu item to the outliner context menu
     bpy.types.OUTLINER_MT_context_menu.append(draw_outliner_context_menu)
     
+    # Register profiling settings
+    profiling.register()
+    
     # Register update checker
     update_checker.register()
 
@@ -213,6 +1443,9 @@ def unregister():
     # Unregister update checker
     update_checker.unregister()
     
+    # Unregister profiling settings
+    profiling.unregister()
+    
     for cls in reversed(classes):
         bpy.utils.unregister_class(cls)
 
@@ -0,0 +1,239 @@
+"""Headless batch conversion of .blend files.
+
+Usage:
+    blender --background --python batch_convert.py -- <dir|manifest.txt|file.blend>... [options]
+
+Options:
+    --jobs N            Number of worker Blender processes (default: CPU count)
+    --output-dir DIR    Save converted files here instead of overwriting the originals
+    --summary PATH      Where to write the JSON summary (default: batch_summary.json)
+    --timeout SECONDS   Kill a worker that takes longer than this (default: no limit)
+    --blender PATH      Blender executable for the workers (default: the running Blender)
+    --link-assets PATH  Link the node groups from this shared Assets.blend instead of appending them
+    --relink            Only relink already converted files to the --link-assets library
+"""
+
+import argparse
+import importlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+ADDON_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_args(argv):
+    # Blender passes everything after "--" through to the script
+    if "--" in argv:
+        argv = argv[argv.index("--") + 1:]
+    else:
+        argv = []
+
+    parser = argparse.ArgumentParser(prog="batch_convert.py", description="Convert .blend files to DayZ textures")
+    parser.add_argument("inputs", nargs="*", help=".blend files, directories or manifest files")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--output-dir")
+    parser.add_argument("--summary", default="batch_summary.json")
+    parser.add_argument("--timeout", type=float)
+    parser.add_argument("--blender")
+    parser.add_argument("--link-assets")
+    parser.add_argument("--relink", action="store_true")
+    # Internal: run by the driver inside each worker Blender
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--save-as", help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def collect_blend_files(inputs):
+    """Expand directories and manifests into a de-duplicated list of (.blend path, output name)
+
+    The output name is the path relative to the directory or manifest it came
+    from, so same-named files in different folders stay apart under --output-dir.
+    """
+    files = []
+    for entry in inputs:
+        if os.path.isdir(entry):
+            for root, dirs, names in os.walk(entry):
+                dirs.sort()
+                for name in sorted(names):
+                    if name.lower().endswith(".blend"):
+                        path = os.path.join(root, name)
+                        files.append((path, os.path.relpath(path, entry)))
+        elif entry.lower().endswith(".blend"):
+            files.append((entry, os.path.basename(entry)))
+        else:
+            # Manifest: one .blend path per line, relative to the manifest
+            base = os.path.dirname(os.path.abspath(entry))
+            with open(entry, encoding="utf-8") as manifest:
+                for line in manifest:
+                    line = line.strip()
+                    if line and not line.startswith("#"):
+                        path = os.path.join(base, line)
+                        files.append((path, os.path.relpath(os.path.abspath(path), base)))
+
+    seen = set()
+    unique = []
+    for path, name in files:
+        path = os.path.abspath(path)
+        if path not in seen:
+            seen.add(path)
+            name = os.path.normpath(name)
+            # Manifest entries outside the manifest's folder keep just their file name
+            if name.startswith(os.pardir):
+                name = os.path.basename(path)
+            unique.append((path, name))
+    return unique
+
+
+def import_addon():
+    """Import the addon package this script ships in, without registering it"""
+    sys.path.insert(0, os.path.dirname(ADDON_DIR))
+    return importlib.import_module(os.path.basename(ADDON_DIR))
+
+
+def run_worker(args):
+    """Convert the .blend file Blender opened and write a result JSON"""
+    import bpy
+
+    started = time.perf_counter()
+    result = {"file": bpy.data.filepath, "output": args.save_as, "status": "ok", "error": None}
+    try:
+        addon = import_addon()
+        if args.link_assets:
+            # The addon isn't registered here, so stand in for its preferences
+            assets_path = os.path.abspath(args.link_assets)
+            addon.get_assets_path = lambda: assets_path
+            addon.use_linked_assets = lambda: True
+        if args.relink:
+            result["relinked"] = addon.relink_phlanka_groups(addon.get_assets_path())
+        else:
+            stats = {}
+            status = addon.replace_node_group(bpy.context, stats)
+            if 'FINISHED' not in status:
+                raise RuntimeError("Conversion was cancelled")
+            result.update(stats)
+        bpy.ops.wm.save_as_mainfile(filepath=args.save_as)
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = round(time.perf_counter() - started, 3)
+
+    with open(args.result, "w", encoding="utf-8") as f:
+        json.dump(result, f)
+
+
+def convert_file(blender, blend_path, save_as, timeout, link_assets=None, relink=False):
+    """Run one worker Blender on a file and return its result"""
+    started = time.perf_counter()
+    fd, result_path = tempfile.mkstemp(suffix=".json", prefix="phlanka_batch_")
+    os.close(fd)
+    command = [
+        blender, "--background", "--factory-startup", blend_path,
+        "--python", os.path.abspath(__file__),
+        "--", "--worker", "--save-as", save_as, "--result", result_path,
+    ]
+    if link_assets:
+        command += ["--link-assets", link_assets]
+    if relink:
+        command.append("--relink")
+    try:
+        proc = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, timeout=timeout)
+        try:
+            with open(result_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            # The worker died before writing its result
+            output = proc.stdout.decode("utf-8", "replace")[-2000:]
+            error = f"Blender exited with code {proc.returncode}: {output}"
+    except subprocess.TimeoutExpired:
+        error = f"Timed out after {timeout} seconds"
+    finally:
+        if os.path.exists(result_path):
+            os.unlink(result_path)
+
+    return {
+        "file": blend_path, "output": save_as, "status": "error", "error": error,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def run_batch(args):
+    blender = args.blender
+    if not blender:
+        try:
+            import bpy
+            blender = bpy.app.binary_path
+        except ImportError:
+            print("--blender is required when not running inside Blender")
+            return 2
+
+    if args.relink and not args.link_assets:
+        print("--relink needs --link-assets")
+        return 2
+
+    files = collect_blend_files(args.inputs)
+    if not files:
+        print("No .blend files found")
+        return 1
+
+    # Output path per input; two inputs must never be written to the same file
+    outputs = {}
+    for path, name in files:
+        save_as = os.path.abspath(os.path.join(args.output_dir, name)) if args.output_dir else path
+        if save_as in outputs:
+            print(f"{path} and {outputs[save_as]} would both be saved as {save_as}")
+            return 2
+        outputs[save_as] = path
+        if args.output_dir:
+            os.makedirs(os.path.dirname(save_as), exist_ok=True)
+
+    jobs = max(1, min(args.jobs, len(files)))
+    print(f"Converting {len(files)} files with {jobs} workers")
+    started = time.perf_counter()
+    results = []
+
+    # Each worker is its own Blender process, threads only wait on them
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = {}
+        for save_as, path in outputs.items():
+            futures[pool.submit(convert_file, blender, path, save_as, args.timeout, args.link_assets, args.relink)] = path
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if result["status"] == "ok":
+                print(f"[ok] {result['file']} ({result['seconds']}s, {result.get('converted', 0)} materials converted)")
+            else:
+                print(f"[error] {result['file']}: {result['error']}")
+
+    results.sort(key=lambda r: r["file"])
+    failed = sum(1 for r in results if r["status"] != "ok")
+    summary = {
+        "files": len(results),
+        "failed": failed,
+        "jobs": jobs,
+        "seconds": round(time.perf_counter() - started, 3),
+        "materials_converted": sum(r.get("converted", 0) for r in results),
+        "results": results,
+    }
+    with open(args.summary, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+
+    print(f"Done: {len(results) - failed} converted, {failed} failed in {summary['seconds']}s. Summary: {args.summary}")
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    args = parse_args(sys.argv if argv is None else argv)
+    if args.worker:
+        run_worker(args)
+        return 0
+    return run_batch(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
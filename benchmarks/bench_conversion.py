@@ -0,0 +1,206 @@
+"""Synthetic-scene benchmark for the conversion path.
+
+Usage:
+    blender --background --factory-startup --python benchmarks/bench_conversion.py -- [options]
+
+Options:
+    --nodes N [N ...]       FPv3 node counts to benchmark (default: 1000 10000 100000)
+    --nodes-per-material N  FPv3 nodes per material (default: 3)
+    --slots N               Material slots per object (default: 2)
+    --share N               Objects sharing each material (default: 4)
+    --inputs N              Input sockets per FPv3 group (default: 8)
+    --linked-inputs N       Inputs per FPv3 node fed by an image texture (default: 4)
+    --links-per-socket N    Downstream links per FPv3 output socket (default: 1)
+    --repeat N              Runs per size, the fastest is kept (default: 1)
+    --output PATH           Results JSON (default: bench_results.json)
+"""
+
+import argparse
+import importlib
+import json
+import math
+import os
+import sys
+import time
+
+import bpy
+
+ADDON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FPV3_GROUPS = ("FPv3 Material", "FPv3 Glass", "FPv3 Layer")
+
+
+def parse_args(argv):
+    argv = argv[argv.index("--") + 1:] if "--" in argv else []
+    parser = argparse.ArgumentParser(prog="bench_conversion.py")
+    parser.add_argument("--nodes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--nodes-per-material", type=int, default=3)
+    parser.add_argument("--slots", type=int, default=2)
+    parser.add_argument("--share", type=int, default=4)
+    parser.add_argument("--inputs", type=int, default=8)
+    parser.add_argument("--linked-inputs", type=int, default=4)
+    parser.add_argument("--links-per-socket", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--output", default="bench_results.json")
+    return parser.parse_args(argv)
+
+
+def import_addon():
+    sys.path.insert(0, os.path.dirname(ADDON_DIR))
+    return importlib.import_module(os.path.basename(ADDON_DIR))
+
+
+def reset_scene():
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+
+
+def build_fpv3_groups(input_count):
+    """Create stand-in FPv3 groups with a mix of color and float inputs"""
+    groups = {}
+    for name in FPV3_GROUPS:
+        tree = bpy.data.node_groups.new(name, 'ShaderNodeTree')
+        for i in range(input_count):
+            socket_type = 'NodeSocketColor' if i % 2 == 0 else 'NodeSocketFloat'
+            tree.interface.new_socket(f"Input {i}", in_out='INPUT', socket_type=socket_type)
+        tree.interface.new_socket("Shader", in_out='OUTPUT', socket_type='NodeSocketShader')
+        groups[name] = tree
+    return groups
+
+
+def build_scene(args, node_count):
+    """Generate objects, slots and shared materials holding node_count FPv3 nodes"""
+    groups = build_fpv3_groups(args.inputs)
+    material_count = max(1, node_count // args.nodes_per_material)
+    link_count = 0
+
+    materials = []
+    for m in range(material_count):
+        material = bpy.data.materials.new(f"M_Bench_{m}")
+        material.use_nodes = True
+        nodes = material.node_tree.nodes
+        links = material.node_tree.links
+        nodes.clear()
+        output = nodes.new('ShaderNodeOutputMaterial')
+        texture = nodes.new('ShaderNodeTexImage')
+
+        for n in range(args.nodes_per_material):
+            node = nodes.new('ShaderNodeGroup')
+            node.node_tree = groups[FPV3_GROUPS[n % len(FPV3_GROUPS)]]
+            for socket in node.inputs[:args.linked_inputs]:
+                links.new(texture.outputs[0], socket)
+                link_count += 1
+            if n == 0:
+                links.new(node.outputs[0], output.inputs[0])
+                link_count += 1
+            for _ in range(args.links_per_socket):
+                reroute = nodes.new('NodeReroute')
+                links.new(node.outputs[0], reroute.inputs[0])
+                link_count += 1
+        materials.append(material)
+
+    # Every material is shared by `share` objects across their slots
+    object_count = max(1, math.ceil(material_count * args.share / args.slots))
+    for o in range(object_count):
+        mesh = bpy.data.meshes.new(f"Bench_{o}")
+        for s in range(args.slots):
+            mesh.materials.append(materials[(o * args.slots + s) % material_count])
+        bpy.data.objects.new(f"Bench_{o}", mesh)
+
+    return {
+        "fpv3_nodes": material_count * args.nodes_per_material,
+        "materials": material_count,
+        "objects": object_count,
+        "links": link_count,
+    }
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - started, result
+
+
+def bench_size(addon, args, node_count):
+    """Time one scene size end to end and per phase, returning the fastest repeat"""
+    best = None
+    for _ in range(args.repeat):
+        # End to end, then again on the converted scene (incremental re-run)
+        reset_scene()
+        scene = build_scene(args, node_count)
+        stats = {}
+        profile = addon.profiling.ConversionProfile()
+        end_to_end, _ = timed(addon.convert_all_materials, bpy.context, stats, profile)
+        profile.finish()
+        rerun, _ = timed(addon.replace_node_group, bpy.context, {})
+
+        # Per phase on a fresh copy of the same scene
+        reset_scene()
+        build_scene(args, node_count)
+        load, loaded_groups = timed(addon.load_phlanka_groups, addon.get_assets_path())
+        materials = [m for m in bpy.data.materials if m.node_tree]
+        fingerprint, _ = timed(lambda: [addon.fingerprint_node_tree(m.node_tree) for m in materials])
+        index, _ = timed(lambda: [addon.index_material_nodes(m.node_tree) for m in materials])
+        addon._socket_plans.clear()
+        replacement_rules = addon.get_replacement_rules()
+        convert, replaced = timed(lambda: sum(addon.convert_material(m, loaded_groups, None, replacement_rules) for m in materials))
+
+        run = dict(scene, nodes_replaced=replaced, stats=stats, profile=profile.as_dict(), timings={
+            "end_to_end": end_to_end,
+            "rerun": rerun,
+            "load_assets": load,
+            "fingerprint": fingerprint,
+            "index": index,
+            "convert": convert,
+        })
+        if best is None or run["timings"]["end_to_end"] < best["timings"]["end_to_end"]:
+            best = run
+    return best
+
+
+def scaling_exponents(runs):
+    """Empirical exponent between consecutive sizes, 1.0 is linear"""
+    result = []
+    for small, large in zip(runs, runs[1:]):
+        size_ratio = large["fpv3_nodes"] / small["fpv3_nodes"]
+        time_ratio = large["timings"]["end_to_end"] / max(small["timings"]["end_to_end"], 1e-9)
+        if size_ratio > 1:
+            result.append({
+                "from": small["fpv3_nodes"],
+                "to": large["fpv3_nodes"],
+                "exponent": round(math.log(time_ratio) / math.log(size_ratio), 3),
+            })
+    return result
+
+
+def main():
+    args = parse_args(sys.argv)
+    addon = import_addon()
+    # Keep the user's on-disk cache out of it, so every run does the same work
+    addon.get_content_cache = lambda: None
+
+    runs = []
+    for node_count in sorted(args.nodes):
+        run = bench_size(addon, args, node_count)
+        runs.append(run)
+        timings = ", ".join(f"{k} {v:.3f}s" for k, v in run["timings"].items())
+        print(f"{run['fpv3_nodes']} nodes / {run['materials']} materials: {timings}")
+
+    results = {
+        "addon_version": ".".join(str(x) for x in addon.bl_info["version"]),
+        "blender_version": bpy.app.version_string,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "params": {k: v for k, v in vars(args).items() if k != "output"},
+        "runs": runs,
+        "scaling": scaling_exponents(runs),
+    }
+    for step in results["scaling"]:
+        flag = "  <-- superlinear" if step["exponent"] > 1.2 else ""
+        print(f"{step['from']} -> {step['to']} nodes: exponent {step['exponent']}{flag}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
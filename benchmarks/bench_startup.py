@@ -0,0 +1,96 @@
+"""Startup-cost benchmark: time to import and register the addon.
+
+Usage:
+    blender --background --factory-startup --python benchmarks/bench_startup.py -- [options]
+
+Options:
+    --repeat N        Import + register cycles to time (default: 20)
+    --budget-ms MS    Exit with status 1 when the median exceeds this (default: 50)
+    --output PATH     Also write the results as JSON
+"""
+
+import argparse
+import importlib
+import json
+import os
+import statistics
+import sys
+import time
+
+import bpy
+
+ADDON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ADDON_NAME = os.path.basename(ADDON_DIR)
+
+# Modules that should only load once an update check, download or texture pack runs
+LAZY_MODULES = ("requests", "zipfile", "tempfile", "cProfile", "numpy")
+
+
+def parse_args(argv):
+    argv = argv[argv.index("--") + 1:] if "--" in argv else []
+    parser = argparse.ArgumentParser(prog="bench_startup.py")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--budget-ms", type=float, default=50.0)
+    parser.add_argument("--output")
+    return parser.parse_args(argv)
+
+
+def unload_addon():
+    for name in [name for name in sys.modules if name == ADDON_NAME or name.startswith(ADDON_NAME + ".")]:
+        del sys.modules[name]
+
+
+def time_cycle():
+    """Import and register from scratch, returning (import seconds, register seconds)"""
+    unload_addon()
+    started = time.perf_counter()
+    addon = importlib.import_module(ADDON_NAME)
+    imported = time.perf_counter()
+    addon.register()
+    registered = time.perf_counter()
+    addon.unregister()
+    return imported - started, registered - imported
+
+
+def main():
+    args = parse_args(sys.argv)
+    sys.path.insert(0, os.path.dirname(ADDON_DIR))
+
+    # Only the first cycle sees a cold import of the lazy modules
+    already_loaded = {name for name in LAZY_MODULES if name in sys.modules}
+    import_times, register_times = [], []
+    for i in range(max(1, args.repeat)):
+        import_time, register_time = time_cycle()
+        import_times.append(import_time)
+        register_times.append(register_time)
+        if i == 0:
+            eager = [name for name in LAZY_MODULES if name in sys.modules and name not in already_loaded]
+
+    totals = [a + b for a, b in zip(import_times, register_times)]
+    results = {
+        "blender_version": bpy.app.version_string,
+        "repeat": len(totals),
+        "first_ms": totals[0] * 1000,
+        "median_ms": statistics.median(totals) * 1000,
+        "median_import_ms": statistics.median(import_times) * 1000,
+        "median_register_ms": statistics.median(register_times) * 1000,
+        "eagerly_imported": eager,
+        "budget_ms": args.budget_ms,
+    }
+
+    print(f"First import+register: {results['first_ms']:.2f} ms")
+    print(f"Median import {results['median_import_ms']:.2f} ms + register {results['median_register_ms']:.2f} ms")
+    if eager:
+        print(f"Modules imported during startup that should be lazy: {', '.join(eager)}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    over_budget = results["median_ms"] > args.budget_ms or results["first_ms"] > args.budget_ms * 4
+    if over_budget or eager:
+        print(f"Startup budget of {args.budget_ms} ms exceeded or lazy modules loaded eagerly")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
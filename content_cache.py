@@ -0,0 +1,209 @@
+import bpy
+import hashlib
+import json
+import os
+import shutil
+import time
+
+# Part of every key, bump it when cached outputs change meaning
+CACHE_VERSION = 1
+
+DEFAULT_MAX_MB = 2048
+
+# A lock file older than this was left behind by a crashed process
+LOCK_STALE_SECONDS = 120
+
+LOCK_NAME = "evict.lock"
+
+# File hashes keyed by (path, mtime, size, algorithm), so unchanged sources are read once per session
+_file_digests = {}
+
+# One cache per root, so stats survive between runs and file loads
+_caches = {}
+
+_default_dir = None
+
+def default_cache_dir():
+    """Per-user cache folder, shared by every Blender (and headless worker) of that user"""
+    global _default_dir
+    if _default_dir is None:
+        _default_dir = bpy.utils.user_resource('DATAFILES', path=os.path.join("PhlankaFortnite", "cache"), create=True)
+    return _default_dir
+
+def make_key(*parts):
+    """Content key for a list of JSON-serializable parts"""
+    return hashlib.sha256(json.dumps([CACHE_VERSION, *parts]).encode()).hexdigest()
+
+def file_digest(path, algorithm="sha256"):
+    """Hash of a file's bytes, read in chunks and only again once it changes on disk"""
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size, algorithm)
+    digest = _file_digests.get(key)
+    if digest is None:
+        sha = hashlib.new(algorithm)
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                sha.update(chunk)
+        digest = _file_digests[key] = sha.hexdigest()
+    return digest
+
+def image_digest(image):
+    """Hash of an image's source bytes, or None for generated or missing images"""
+    if image.packed_file:
+        return hashlib.sha256(image.packed_file.data).hexdigest()
+    if image.source not in {'FILE', 'SEQUENCE', 'TILED'} or not image.filepath:
+        return None
+    try:
+        return file_digest(bpy.path.abspath(image.filepath, library=image.library))
+    except OSError:
+        return None
+
+class ContentCache:
+    """Content-addressed file store with size-bounded LRU eviction
+
+    Entries are written to a temporary file and renamed into place, so
+    parallel workers sharing the folder never see half-written data. Reads
+    touch the entry's mtime, which eviction uses as the last-used time.
+    """
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        # Bytes on disk as of the last eviction pass plus what this process wrote since
+        self.size = None
+
+    def path_for(self, key):
+        return os.path.join(self.root, key[:2], key)
+
+    def fetch(self, key, destination):
+        """Copy an entry to destination, returns False on a miss"""
+        path = self.path_for(key)
+        temp_path = f"{destination}.{os.getpid()}.tmp"
+        try:
+            shutil.copyfile(path, temp_path)
+            os.replace(temp_path, destination)
+        except OSError:
+            # Missing, or evicted by another process while copying
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            self.misses += 1
+            return False
+        self.touch(path)
+        self.hits += 1
+        self.bytes_read += os.path.getsize(destination)
+        return True
+
+    def store(self, key, source):
+        """Add a copy of the file at source under key"""
+        def fill(f):
+            with open(source, "rb") as src:
+                shutil.copyfileobj(src, f)
+        self.write(key, fill)
+
+    def write(self, key, fill):
+        path = self.path_for(key)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(temp_path, "wb") as f:
+                fill(f)
+            size = os.path.getsize(temp_path)
+            # Identical content under the same key, so concurrent writers may race freely
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"PhlankaFortnite: could not write cache entry {path}: {e}")
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            return
+        self.bytes_written += size
+        if self.size is not None:
+            self.size += size
+
+    @staticmethod
+    def touch(path):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def evict(self):
+        """Remove the least recently used entries until the cache fits its size limit"""
+        if self.size is not None and self.size <= self.max_bytes:
+            return
+        # Only one process evicts at a time; the others carry on and check again next run
+        lock_path = os.path.join(self.root, LOCK_NAME)
+        try:
+            if time.time() - os.path.getmtime(lock_path) > LOCK_STALE_SECONDS:
+                os.unlink(lock_path)
+        except OSError:
+            pass
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except OSError:
+            return
+
+        try:
+            entries = []
+            now = time.time()
+            for directory, dirs, names in os.walk(self.root):
+                for name in names:
+                    path = os.path.join(directory, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    if name.endswith(".tmp"):
+                        # Left by a crashed writer
+                        if now - stat.st_mtime > LOCK_STALE_SECONDS:
+                            remove_file(path)
+                    elif name != LOCK_NAME:
+                        entries.append((stat.st_mtime, stat.st_size, path))
+
+            total = sum(size for mtime, size, path in entries)
+            entries.sort()
+            for mtime, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                if remove_file(path):
+                    total -= size
+            self.size = total
+        finally:
+            remove_file(lock_path)
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "size": self.size,
+        }
+
+def remove_file(path):
+    try:
+        os.unlink(path)
+        return True
+    except OSError:
+        return False
+
+def get_cache(root, max_bytes):
+    cache = _caches.get(root)
+    if cache is None:
+        cache = _caches[root] = ContentCache(root, max_bytes)
+    cache.max_bytes = max_bytes
+    return cache
+
+def draw_stats(layout, cache):
+    """Draw a cache's counters into a panel layout"""
+    box = layout.box()
+    box.label(text="Cache")
+    col = box.column(align=True)
+    col.label(text=f"Hits: {cache.hits}  Misses: {cache.misses}")
+    col.label(text=f"Read: {cache.bytes_read / (1024 * 1024):.1f} MB  Written: {cache.bytes_written / (1024 * 1024):.1f} MB")
+    if cache.size is not None:
+        col.label(text=f"On disk: {cache.size / (1024 * 1024):.1f} of {cache.max_bytes / (1024 * 1024):.0f} MB")
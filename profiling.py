@@ -0,0 +1,139 @@
+import bpy
+import json
+from time import perf_counter
+
+# Phases of a conversion run, in the order they are shown in the panel
+PHASES = (
+    ("load_assets", "Assets.blend load"),
+    ("merge_materials", "Merge duplicate materials"),
+    ("material_walk", "Material walk"),
+    ("node_creation", "Node creation"),
+    ("link_rewiring", "Link rewiring"),
+    ("node_removal", "Node removal"),
+    ("merge_images", "Merge duplicate images"),
+    ("purge", "Purge FPv3 data"),
+    ("pack_textures", "Texture packing"),
+)
+
+COUNTERS = (
+    ("materials_visited", "Materials visited"),
+    ("nodes_replaced", "Nodes replaced"),
+    ("links_created", "Links created"),
+    ("values_copied", "Default values copied"),
+)
+
+# Profile of the most recent instrumented run, shown in the sidebar panel
+last_profile = None
+
+class ConversionProfile:
+    """Per-phase wall time and counters for one conversion run"""
+
+    def __init__(self):
+        self.timings = {key: 0.0 for key, label in PHASES}
+        self.counts = {key: 0 for key, label in COUNTERS}
+        self.total = 0.0
+        self._started = perf_counter()
+
+    def pause(self):
+        """Stop the clock while a modal run hands control back to Blender"""
+        if self._started is not None:
+            self.total += perf_counter() - self._started
+            self._started = None
+
+    def resume(self):
+        if self._started is None:
+            self._started = perf_counter()
+
+    def finish(self):
+        """Stop the clock; the material walk is whatever the other phases didn't account for"""
+        self.pause()
+        other = sum(seconds for key, seconds in self.timings.items() if key != "material_walk")
+        self.timings["material_walk"] = max(0.0, self.total - other)
+
+    def as_dict(self):
+        return {"total": self.total, "timings": dict(self.timings), "counts": dict(self.counts)}
+
+def is_enabled(context):
+    """Instrumentation is opt-in per scene; unregistered (headless) runs never profile"""
+    scene = getattr(context, "scene", None)
+    return bool(scene and getattr(scene, "phlanka_profile", False))
+
+def run_profiled(context, convert):
+    """Run convert(profile) with instrumentation, optionally dumping JSON / cProfile stats"""
+    profiler = None
+    if context.scene.phlanka_profile_cprofile:
+        import cProfile
+        profiler = cProfile.Profile()
+
+    profile = ConversionProfile()
+    if profiler:
+        profiler.enable()
+    try:
+        result = convert(profile)
+    finally:
+        if profiler:
+            profiler.disable()
+        finish_profile(context, profile, profiler)
+
+    return result
+
+def finish_profile(context, profile, profiler=None):
+    """Close a run's profile, keep it for the panel and write the dumps if requested"""
+    global last_profile
+
+    profile.finish()
+    last_profile = profile
+
+    scene = context.scene
+    if not scene.phlanka_profile_path:
+        return
+    dump_path = bpy.path.abspath(scene.phlanka_profile_path)
+    try:
+        with open(dump_path + ".json", "w", encoding="utf-8") as f:
+            json.dump(profile.as_dict(), f, indent=2)
+        if profiler:
+            profiler.dump_stats(dump_path + ".prof")
+    except OSError as e:
+        print(f"PhlankaFortnite: could not write profile to {dump_path}: {e}")
+
+def draw_profile(layout, context):
+    """Draw the profiling settings and the last report into a panel layout"""
+    scene = context.scene
+    box = layout.box()
+    box.prop(scene, "phlanka_profile")
+    if not scene.phlanka_profile:
+        return
+    box.prop(scene, "phlanka_profile_cprofile")
+    box.prop(scene, "phlanka_profile_path")
+
+    if last_profile is None:
+        return
+    col = box.column(align=True)
+    col.label(text=f"Total: {last_profile.total * 1000:.1f} ms")
+    for key, label in PHASES:
+        col.label(text=f"{label}: {last_profile.timings[key] * 1000:.1f} ms")
+    col.separator()
+    for key, label in COUNTERS:
+        col.label(text=f"{label}: {last_profile.counts[key]}")
+
+def register():
+    bpy.types.Scene.phlanka_profile = bpy.props.BoolProperty(
+        name="Profile Conversion",
+        description="Record per-phase timings and counts for conversion runs",
+        default=False,
+    )
+    bpy.types.Scene.phlanka_profile_cprofile = bpy.props.BoolProperty(
+        name="cProfile",
+        description="Also run the conversion under cProfile",
+        default=False,
+    )
+    bpy.types.Scene.phlanka_profile_path = bpy.props.StringProperty(
+        name="Dump To",
+        description="Write the report to <path>.json (and <path>.prof with cProfile); leave empty to skip",
+        subtype='FILE_PATH',
+    )
+
+def unregister():
+    del bpy.types.Scene.phlanka_profile_path
+    del bpy.types.Scene.phlanka_profile_cprofile
+    del bpy.types.Scene.phlanka_profile
@@ -0,0 +1,87 @@
+import os
+import re
+import json
+import hashlib
+
+# Rule file shipped next to Assets.blend
+RULES_FILENAME = "replacement_rules.json"
+
+# Newest rule file format this version of the addon understands
+RULES_FORMAT_VERSION = 1
+
+# Compiled rules keyed by (path, mtime, size) so the file is parsed once per version
+_rules_cache = {}
+
+class ReplacementRules:
+    """Compiled mapping from FPv3 node_tree names to the Phlanka group replacing them
+
+    Rules match a node_tree name exactly ("match"), by prefix ("prefix") or by regular
+    expression ("regex"). Exact names are a dict lookup; prefix and regex rules are only
+    evaluated once per distinct name and the answer is memoized, so matching cost stays
+    flat however many rules there are.
+    """
+
+    def __init__(self, data, digest=""):
+        version = data.get("version", 1)
+        if version > RULES_FORMAT_VERSION:
+            raise ValueError(f"Replacement rules version {version} is newer than this addon supports")
+
+        self.version = version
+        self.digest = digest
+        self.exact = {}
+        self.patterns = []
+        self.targets = []
+        for rule in data.get("rules", []):
+            target = rule["target"]
+            if target not in self.targets:
+                self.targets.append(target)
+            if "match" in rule:
+                self.exact.setdefault(rule["match"], target)
+            elif "prefix" in rule:
+                self.patterns.append((re.compile(re.escape(rule["prefix"])), target))
+            elif "regex" in rule:
+                self.patterns.append((re.compile(rule["regex"]), target))
+            else:
+                raise ValueError(f"Replacement rule for {target} has no match, prefix or regex")
+
+        # The Material Output fallback never replaces our own groups or anything a rule handles
+        fallback = data.get("output_fallback") or {}
+        self.fallback_target = fallback.get("target")
+        if self.fallback_target and self.fallback_target not in self.targets:
+            self.targets.append(self.fallback_target)
+        self.fallback_excluded = frozenset(fallback.get("exclude", [])) | frozenset(self.targets)
+
+        self._resolved = {}
+
+    def target_for(self, tree_name):
+        """Phlanka group replacing nodes of the given node_tree, or None"""
+        try:
+            return self._resolved[tree_name]
+        except KeyError:
+            pass
+        target = self.exact.get(tree_name)
+        if target is None:
+            target = next((target for pattern, target in self.patterns if pattern.match(tree_name)), None)
+        self._resolved[tree_name] = target
+        return target
+
+def load_rules(path):
+    """Load and compile a rule file, reusing the compiled rules while it is unchanged"""
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    rules = _rules_cache.get(key)
+    if rules is None:
+        with open(path, 'rb') as f:
+            raw = f.read()
+        rules = ReplacementRules(json.loads(raw.decode('utf-8')), hashlib.sha1(raw).hexdigest())
+        _rules_cache.clear()
+        _rules_cache[key] = rules
+    return rules
+
+def find_rules_file(assets_path, addon_dir):
+    """The rule file next to the Assets.blend in use, falling back to the bundled one"""
+    for directory in (os.path.dirname(assets_path), addon_dir):
+        path = os.path.join(directory, RULES_FILENAME)
+        if os.path.exists(path):
+            return path
+    return None
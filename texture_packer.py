@@ -0,0 +1,240 @@
+import bpy
+import hashlib
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from . import content_cache
+
+# Phlanka group inputs an image texture can feed, per source role. Matched by
+# socket name, the same names the FPv3 groups use.
+SOURCE_SOCKETS = {
+    "diffuse": ("Diffuse", "Base Color", "Color"),
+    "normal": ("Normals", "Normal"),
+    "specular": ("SpecularMasks", "Specular Masks", "Specular"),
+    "mask": ("M", "Mask", "AO"),
+}
+
+# DayZ maps: (suffix, source role, colorspace of the written file)
+DAYZ_MAPS = (
+    ("_co", "diffuse", 'sRGB'),
+    ("_nohq", "normal", 'Non-Color'),
+    ("_smdi", "specular", 'Non-Color'),
+    ("_as", "mask", 'Non-Color'),
+)
+
+FILE_FORMAT = 'PNG'
+
+# Sources read and packed at once by default; a 4K source is 256 MB as float32
+# RGBA and each map needs another copy, so this bounds peak memory
+MAX_WORKERS = 4
+
+# Part of the cache key of every packed map, bump it when a packer changes its output
+PACK_VERSION = 1
+
+def find_source_node(socket):
+    """Image texture node linked into a socket, following reroutes"""
+    while socket.is_linked:
+        node = socket.links[0].from_node
+        if node.type == 'TEX_IMAGE':
+            return node
+        if node.type != 'REROUTE':
+            return None
+        socket = node.inputs[0]
+    return None
+
+def find_source_image(socket):
+    node = find_source_node(socket)
+    return node.image if node else None
+
+def collect_sources(material, group_pointers):
+    """Source images by role for the first Phlanka group node of a material that has any"""
+    if not material.node_tree:
+        return {}
+    for node in material.node_tree.nodes:
+        if node.type != 'GROUP' or not node.node_tree or node.node_tree.as_pointer() not in group_pointers:
+            continue
+        sources = {}
+        for role, names in SOURCE_SOCKETS.items():
+            for name in names:
+                socket = node.inputs.get(name)
+                image = find_source_image(socket) if socket else None
+                # Missing files report a size of zero
+                if image and image.size[0] and image.size[1]:
+                    sources[role] = image
+                    break
+        if sources:
+            return sources
+    return {}
+
+def read_pixels(image):
+    """Pixels of an image as a float32 (height, width, 4) array, in one foreach_get"""
+    import numpy as np
+
+    width, height = image.size
+    channels = image.channels
+    buffer = np.empty(width * height * channels, dtype=np.float32)
+    image.pixels.foreach_get(buffer)
+    pixels = buffer.reshape(height, width, channels)
+    if channels == 4:
+        return pixels
+
+    rgba = np.ones((height, width, 4), dtype=np.float32)
+    if channels >= 3:
+        rgba[..., :3] = pixels[..., :3]
+    else:
+        rgba[..., :3] = pixels[..., :1]
+    return rgba
+
+def pixel_digest(image):
+    """Hash of an image's decoded pixels, read in one foreach_get without an RGBA copy"""
+    import numpy as np
+
+    buffer = np.empty(len(image.pixels), dtype=np.float32)
+    image.pixels.foreach_get(buffer)
+    return hashlib.sha1(buffer).hexdigest()
+
+def linear_to_srgb(values):
+    import numpy as np
+
+    values = np.clip(values, 0.0, 1.0)
+    return np.where(values <= 0.0031308, values * 12.92, 1.055 * np.power(values, 1 / 2.4) - 0.055)
+
+# Float images hold linear values, byte images the stored (display encoded) ones
+def pack_co(pixels, is_linear):
+    """Color map: RGB in sRGB, alpha kept for transparency"""
+    packed = pixels.copy()
+    if is_linear:
+        packed[..., :3] = linear_to_srgb(packed[..., :3])
+    return packed
+
+def pack_nohq(pixels, is_linear):
+    """Normal map: green flipped for DayZ, blue rebuilt from XY for two-channel normals"""
+    import numpy as np
+
+    packed = np.empty_like(pixels)
+    x = pixels[..., 0] * 2.0 - 1.0
+    y = pixels[..., 1] * 2.0 - 1.0
+    z = np.sqrt(np.clip(1.0 - x * x - y * y, 0.0, 1.0))
+    packed[..., 0] = pixels[..., 0]
+    packed[..., 1] = 1.0 - pixels[..., 1]
+    packed[..., 2] = z * 0.5 + 0.5
+    packed[..., 3] = 1.0
+    return packed
+
+def pack_smdi(pixels, is_linear):
+    """Specular map: red unused (white), green specular, blue gloss from the roughness in blue"""
+    import numpy as np
+
+    packed = np.ones_like(pixels)
+    packed[..., 1] = pixels[..., 0]
+    packed[..., 2] = 1.0 - pixels[..., 2]
+    return packed
+
+def pack_as(pixels, is_linear):
+    """Ambient shadow map: ambient occlusion from the mask's red channel in green"""
+    import numpy as np
+
+    packed = np.ones_like(pixels)
+    packed[..., 1] = pixels[..., 0]
+    return packed
+
+PACKERS = {
+    "_co": pack_co,
+    "_nohq": pack_nohq,
+    "_smdi": pack_smdi,
+    "_as": pack_as,
+}
+
+def write_image(name, pixels, path, colorspace):
+    """Save a packed array through a temporary Blender image, which is removed again"""
+    height, width = pixels.shape[:2]
+    image = bpy.data.images.new(name, width, height, alpha=True)
+    try:
+        image.colorspace_settings.name = colorspace
+        image.pixels.foreach_set(pixels.ravel())
+        image.filepath_raw = path
+        image.file_format = FILE_FORMAT
+        image.save()
+    finally:
+        bpy.data.images.remove(image)
+
+def texture_key(suffix, image):
+    """Cache key of one packed map, or None when the source can't be hashed"""
+    # Unsaved edits aren't in the source bytes
+    if image.is_dirty:
+        return None
+    digest = content_cache.image_digest(image)
+    if digest is None:
+        return None
+    # How the bytes decode depends on these settings too
+    return content_cache.make_key("texture", PACK_VERSION, FILE_FORMAT, suffix, digest, image.is_float,
+                                  image.colorspace_settings.name, image.alpha_mode)
+
+def pack_materials(materials, group_pointers, output_dir, workers=None, cache=None):
+    """Write the DayZ maps of every material into output_dir, returns (files written, materials packed)"""
+    # Output paths per (map, source image) pair: each pair is produced once,
+    # then copied to the other materials that use it
+    outputs = {}
+    sources = {}
+    packed_materials = set()
+    extension = "." + FILE_FORMAT.lower()
+    for material in materials:
+        material_sources = collect_sources(material, group_pointers)
+        for suffix, role, colorspace in DAYZ_MAPS:
+            image = material_sources.get(role)
+            if not image:
+                continue
+            pair = (suffix, image.as_pointer())
+            sources[pair] = (image, colorspace)
+            path = os.path.join(output_dir, bpy.path.clean_name(material.name) + suffix + extension)
+            outputs.setdefault(pair, []).append(path)
+            packed_materials.add(material.name)
+    if not outputs:
+        return 0, 0
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Pairs packed before, in this or any other file, are copied from the cache
+    keys = {}
+    pending = []
+    for pair, (image, colorspace) in sources.items():
+        key = keys[pair] = texture_key(pair[0], image) if cache else None
+        if key is None or not cache.fetch(key, outputs[pair][0]):
+            pending.append(pair)
+
+    # All maps of one source are packed together, so it is read once and freed after
+    by_source = {}
+    for pair in pending:
+        by_source.setdefault(pair[1], []).append(pair)
+    source_pointers = list(by_source)
+
+    # Reading and writing pixels has to happen on the main thread; the numpy
+    # work in between releases the GIL, so that part runs in the pool. Sources
+    # go through in batches of one per worker to bound memory.
+    workers = workers or min(os.cpu_count() or 1, MAX_WORKERS)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for start in range(0, len(source_pointers), workers):
+            tasks = []
+            for pointer in source_pointers[start:start + workers]:
+                pairs = by_source[pointer]
+                image = sources[pairs[0]][0]
+                source = read_pixels(image)
+                for pair in pairs:
+                    tasks.append((pair, pool.submit(PACKERS[pair[0]], source, image.is_float)))
+                # Only the tasks hold the source now, it goes once they are done
+                del source
+
+            while tasks:
+                pair, task = tasks.pop(0)
+                path = outputs[pair][0]
+                image, colorspace = sources[pair]
+                write_image(os.path.splitext(os.path.basename(path))[0], task.result(), path, colorspace)
+                if keys[pair]:
+                    cache.store(keys[pair], path)
+
+    for paths in outputs.values():
+        for path in paths[1:]:
+            shutil.copyfile(paths[0], path)
+    if cache:
+        cache.evict()
+
+    return sum(len(paths) for paths in outputs.values()), len(packed_materials)
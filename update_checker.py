@@ -1,20 +1,31 @@
 import bpy
-import requests
 import re
 import os
-import zipfile
-import tempfile
 import threading
-import addon_utils
+import queue
 import traceback
 from bpy.app.handlers import persistent
 import time
+import json
+import hashlib
 
 # Configuration
 GITHUB_REPO = "Phlanka/PhlankaFortnite"
 GITHUB_API_URL = f"https://api.github.com/repos/{GITHUB_REPO}/releases/latest"
 GITHUB_DOWNLOAD_URL = f"https://github.com/{GITHUB_REPO}/releases/download/"
 
+# How long a cached release lookup is trusted before asking GitHub again
+UPDATE_CACHE_TTL = 6 * 60 * 60
+
+# Per-file SHA-256 manifest optionally shipped in release zips, and the copy
+# kept in the installed addon so unchanged files can be skipped on update
+RELEASE_MANIFEST_NAME = "manifest.json"
+INSTALLED_MANIFEST_NAME = ".phlanka_manifest.json"
+INSTALL_CHUNK_SIZE = 1024 * 1024
+
+# Set while a background check is running so checks never pile up
+_check_in_progress = False
+
 def log_error(message):
     """Log error to Blender's console and print to system console"""
     print(f"PhlankaFortnite ERROR: {message}")
@@ -25,23 +36,77 @@ class PhlankaUpdateChecker:
     @staticmethod
     def get_addon_version():
         """Get the current addon version"""
-        for mod in addon_utils.modules():
-            if mod.bl_info.get('name') == "Phlanka Fortnite":  # Note the space in the name
-                version_tuple = mod.bl_info.get('version', (0, 0, 0))
-                return ".".join(str(x) for x in version_tuple)
-        return "0.0.0"
+        # Read our own bl_info rather than scanning every installed addon
+        from . import bl_info
+        version_tuple = bl_info.get('version', (0, 0, 0))
+        return ".".join(str(x) for x in version_tuple)
+    
+    @staticmethod
+    def get_cache_path():
+        """Location of the on-disk release cache"""
+        config_dir = bpy.utils.user_resource('CONFIG', path="PhlankaFortnite", create=True)
+        return os.path.join(config_dir, "update_cache.json")
     
     @staticmethod
-    def get_latest_version():
-        """Get the latest version from GitHub"""
+    def read_cache(cache_path):
+        """Load the cached release lookup, or an empty dict"""
+        if not cache_path:
+            return {}
         try:
-            response = requests.get(GITHUB_API_URL, timeout=5)
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+            return cache if isinstance(cache, dict) else {}
+        except (OSError, ValueError):
+            return {}
+    
+    @staticmethod
+    def write_cache(cache_path, cache):
+        """Write the cache atomically so a concurrent Blender never reads half a file"""
+        if not cache_path:
+            return
+        try:
+            temp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(cache, f)
+            os.replace(temp_path, cache_path)
+        except OSError as e:
+            print(f"Warning: Could not write update cache {cache_path}: {e}")
+    
+    @staticmethod
+    def get_latest_version(url=GITHUB_API_URL, cache_path=None, ttl=UPDATE_CACHE_TTL):
+        """Get the latest version from GitHub, using the on-disk cache when it is fresh"""
+        cache = PhlankaUpdateChecker.read_cache(cache_path)
+        now = time.time()
+        if cache.get('tag_name') and now - cache.get('checked_at', 0) < ttl:
+            return cache.get('version'), cache.get('tag_name')
+        
+        try:
+            # Imported on first use so enabling the addon doesn't pay for it
+            import requests
+            
+            # A conditional request is answered with 304 when nothing changed
+            headers = {'Accept': 'application/vnd.github+json'}
+            if cache.get('etag') and cache.get('tag_name'):
+                headers['If-None-Match'] = cache['etag']
+            response = requests.get(url, headers=headers, timeout=5)
+            
+            if response.status_code == 304:
+                cache['checked_at'] = now
+                PhlankaUpdateChecker.write_cache(cache_path, cache)
+                return cache.get('version'), cache.get('tag_name')
+            
             if response.status_code == 200:
                 data = response.json()
                 tag_name = data.get('tag_name', '')
                 # Extract version number from tag (assuming format V*.*.*)
                 match = re.search(r'V?(\d+\.\d+\.\d+)', tag_name)
                 if match:
+                    PhlankaUpdateChecker.write_cache(cache_path, {
+                        'etag': response.headers.get('ETag'),
+                        'checked_at': now,
+                        'version': match.group(1),
+                        'tag_name': tag_name,
+                    })
                     return match.group(1), tag_name  # Return both version number and full tag
             return None, None
         except Exception as e:
@@ -54,10 +119,11 @@ class PhlankaUpdateChecker:
         return tuple(map(int, version_str.split('.')))
     
     @staticmethod
-    def is_update_available():
+    def is_update_available(current_version=None, cache_path=None, ttl=UPDATE_CACHE_TTL, url=GITHUB_API_URL):
         """Check if an update is available"""
-        current_version = PhlankaUpdateChecker.get_addon_version()
-        latest_version, tag_name = PhlankaUpdateChecker.get_latest_version()
+        if current_version is None:
+            current_version = PhlankaUpdateChecker.get_addon_version()
+        latest_version, tag_name = PhlankaUpdateChecker.get_latest_version(url, cache_path, ttl)
         
         print(f"Current version: {current_version}, Latest version: {latest_version}")
         
@@ -74,142 +140,300 @@ class PhlankaUpdateChecker:
         return False, None, None
     
     @staticmethod
-    def download_and_install_update(version, tag_name=None):
+    def file_sha256(path):
+        """Hash a file in chunks"""
+        sha = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(INSTALL_CHUNK_SIZE), b''):
+                sha.update(chunk)
+        return sha.hexdigest()
+    
+    @staticmethod
+    def installed_file_hash(addon_dir, rel_path, installed_manifest):
+        """Hash of an installed file, from the install manifest when the file is untouched since"""
+        path = os.path.join(addon_dir, rel_path)
+        if not os.path.isfile(path):
+            return None
+        entry = installed_manifest.get(rel_path)
+        stat = os.stat(path)
+        if entry and entry.get('size') == stat.st_size and entry.get('mtime_ns') == stat.st_mtime_ns:
+            return entry.get('sha256')
+        return PhlankaUpdateChecker.file_sha256(path)
+    
+    @staticmethod
+    def install_from_zip(zip_path, addon_dir):
+        """Install a release zip into addon_dir, returns (files written, files reused)
+        
+        Files are streamed into a staging directory next to the addon, and files whose
+        hash matches the release manifest are hard-linked from the current install
+        instead of rewritten. The staging directory is then swapped in, so at every
+        point either the complete old or the complete new addon is on disk.
+        """
+        import shutil
+        import zipfile
+        
+        addon_dir = os.path.abspath(addon_dir)
+        staging_dir = addon_dir + ".staging"
+        previous_dir = addon_dir + ".previous"
+        # A run that died between the two renames below left only the old addon,
+        # under .previous; put it back before anything is cleaned up
+        if not os.path.exists(addon_dir) and os.path.isdir(previous_dir):
+            os.rename(previous_dir, addon_dir)
+        for leftover in (staging_dir, previous_dir):
+            if os.path.exists(leftover):
+                shutil.rmtree(leftover)
+        
+        try:
+            with open(os.path.join(addon_dir, INSTALLED_MANIFEST_NAME), 'r', encoding='utf-8') as f:
+                installed_manifest = json.load(f)
+        except (OSError, ValueError):
+            installed_manifest = {}
+        
+        written = reused = 0
+        new_manifest = {}
+        try:
+            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+                names = zip_ref.namelist()
+                if not names:
+                    raise zipfile.BadZipFile("The archive is empty")
+                
+                # GitHub zips wrap everything in a root folder with the repo name and tag
+                root_folder = names[0].split('/')[0] + '/'
+                if not all(name.startswith(root_folder) for name in names):
+                    root_folder = ''
+                print(f"Root folder in zip: {root_folder or '(none)'}")
+                
+                members = {}
+                for name in names:
+                    rel_path = name[len(root_folder):]
+                    if not rel_path or name.endswith('/'):
+                        continue
+                    # Never let an entry escape the addon directory
+                    if os.path.isabs(rel_path) or '..' in rel_path.split('/'):
+                        raise zipfile.BadZipFile(f"Unsafe path in archive: {name}")
+                    members[rel_path] = name
+                
+                # Optional release manifest of per-file SHA-256 hashes
+                release_manifest = {}
+                if RELEASE_MANIFEST_NAME in members:
+                    release_manifest = json.loads(zip_ref.read(members[RELEASE_MANIFEST_NAME]))
+                    release_manifest = release_manifest.get('files', release_manifest)
+                
+                for rel_path, name in members.items():
+                    target_path = os.path.join(staging_dir, *rel_path.split('/'))
+                    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+                    expected = release_manifest.get(rel_path)
+                    
+                    # Unchanged files are linked from the current install instead of rewritten
+                    if expected and PhlankaUpdateChecker.installed_file_hash(addon_dir, rel_path, installed_manifest) == expected:
+                        current_path = os.path.join(addon_dir, *rel_path.split('/'))
+                        try:
+                            os.link(current_path, target_path)
+                        except OSError:
+                            shutil.copy2(current_path, target_path)
+                        digest = expected
+                        reused += 1
+                    else:
+                        # Stream in chunks; zipfile checks each member's CRC as it is read
+                        sha = hashlib.sha256()
+                        with zip_ref.open(name) as source, open(target_path, 'wb') as target:
+                            for chunk in iter(lambda: source.read(INSTALL_CHUNK_SIZE), b''):
+                                sha.update(chunk)
+                                target.write(chunk)
+                        digest = sha.hexdigest()
+                        if expected and digest != expected:
+                            raise zipfile.BadZipFile(f"Hash mismatch for {rel_path}")
+                        written += 1
+                    
+                    stat = os.stat(target_path)
+                    new_manifest[rel_path] = {'sha256': digest, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+            
+            with open(os.path.join(staging_dir, INSTALLED_MANIFEST_NAME), 'w', encoding='utf-8') as f:
+                json.dump(new_manifest, f, indent=1)
+            
+            # Swap the staged addon in; if the second rename fails put the old one back
+            os.rename(addon_dir, previous_dir)
+            try:
+                os.rename(staging_dir, addon_dir)
+            except OSError:
+                os.rename(previous_dir, addon_dir)
+                raise
+        except BaseException:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise
+        
+        shutil.rmtree(previous_dir, ignore_errors=True)
+        return written, reused
+    
+    @staticmethod
+    def download_and_install_update(version, tag_name=None, download_base=GITHUB_DOWNLOAD_URL):
         """Download and install the update"""
         # Capture tag_name in the outer function scope
         if not tag_name:
             tag_name = f"V{version}"
         
+        # Only needed once an update is actually installed
+        import requests
+        import tempfile
+        import zipfile
+        
+        # Get addon directory here, on the main thread, as it asks bpy
+        addon_dir = None
+        
+        # First try to get it from the module path (this file lives in the addon)
+        module_dir = os.path.dirname(os.path.abspath(__file__))
+        if os.path.exists(os.path.join(module_dir, "__init__.py")):
+            addon_dir = module_dir
+        
+        # If that fails, try to find it in the addon paths
+        if not addon_dir:
+            for path in bpy.utils.script_paths("addons"):
+                potential_path = os.path.join(path, "PhlankaFortnite")
+                if os.path.exists(potential_path):
+                    addon_dir = potential_path
+                    break
+        
+        # If still not found, try user addons
+        if not addon_dir:
+            user_path = bpy.utils.user_resource('SCRIPTS', path="addons")
+            potential_path = os.path.join(user_path, "PhlankaFortnite")
+            if os.path.exists(potential_path):
+                addon_dir = potential_path
+        
+        if not addon_dir:
+            error_msg = "Could not locate addon directory. Please update manually."
+            log_error(error_msg)
+            show_message_box("Update failed", error_msg)
+            return
+        
+        print(f"Found addon directory: {addon_dir}")
+        
+        # The timer registry isn't thread-safe, so the worker only queues the
+        # (title, message) to show and a timer registered here polls it
+        messages = queue.Queue()
+        
         # Create a closure that has access to tag_name
         def download_thread(tag_name=tag_name, version=version):
+            temp_path = None
             try:
                 # Download the update - use the direct asset URL
-                download_url = f"{GITHUB_DOWNLOAD_URL}{tag_name}/PhlankaFortnite.zip"
+                download_url = f"{download_base}{tag_name}/PhlankaFortnite.zip"
                 print(f"Downloading update from: {download_url}")
-                response = requests.get(download_url, stream=True)
+                response = requests.get(download_url, stream=True, timeout=30)
                 
                 if response.status_code != 200:
                     error_msg = f"Failed to download update: HTTP {response.status_code}"
                     log_error(error_msg)
-                    bpy.app.timers.register(
-                        lambda: show_message_box("Update failed", error_msg), 
-                        first_interval=0.1
-                    )
+                    messages.put(("Update failed", error_msg))
                     return
                 
-                # Save to temporary file
+                # Stream to a temporary file
                 with tempfile.NamedTemporaryFile(delete=False, suffix='.zip') as temp_file:
                     temp_path = temp_file.name
                     print(f"Saving update to temporary file: {temp_path}")
-                    for chunk in response.iter_content(chunk_size=8192):
+                    for chunk in response.iter_content(chunk_size=INSTALL_CHUNK_SIZE):
                         if chunk:
                             temp_file.write(chunk)
                 
-                # Get addon directory - improved method
-                addon_dir = None
-                
-                # First try to get it from the module path
-                for mod in addon_utils.modules():
-                    if mod.__name__ == "PhlankaFortnite" or mod.__name__.endswith(".PhlankaFortnite"):
-                        addon_dir = os.path.dirname(os.path.abspath(mod.__file__))
-                        break
-                
-                # If that fails, try to find it in the addon paths
-                if not addon_dir:
-                    for path in bpy.utils.script_paths("addons"):
-                        potential_path = os.path.join(path, "PhlankaFortnite")
-                        if os.path.exists(potential_path):
-                            addon_dir = potential_path
-                            break
-                
-                # If still not found, try user addons
-                if not addon_dir:
-                    user_path = bpy.utils.user_resource('SCRIPTS', path="addons")
-                    potential_path = os.path.join(user_path, "PhlankaFortnite")
-                    if os.path.exists(potential_path):
-                        addon_dir = potential_path
-                
-                if not addon_dir:
-                    error_msg = "Could not locate addon directory. Please update manually."
-                    log_error(error_msg)
-                    bpy.app.timers.register(
-                        lambda: show_message_box("Update failed", error_msg), 
-                        first_interval=0.1
-                    )
-                    return
-                
-                print(f"Found addon directory: {addon_dir}")
-                
-                # Extract the zip file
+                # Verify, stage and swap in the new version
                 try:
-                    with zipfile.ZipFile(temp_path, 'r') as zip_ref:
-                        # The GitHub zip has a root folder with the repo name and tag
-                        # We need to extract only the contents to our addon directory
-                        root_folder = zip_ref.namelist()[0]  # This is the root folder name
-                        print(f"Root folder in zip: {root_folder}")
-                        
-                        for file in zip_ref.namelist():
-                            if file.startswith(root_folder):
-                                # Skip the root directory itself
-                                if file == root_folder or file.endswith('/'):
-                                    continue
-                                    
-                                # Get the relative path within the addon
-                                rel_path = file[len(root_folder):]
-                                # Extract to the addon directory
-                                source = zip_ref.open(file)
-                                target_path = os.path.join(addon_dir, rel_path)
-                                
-                                # Create directories if needed
-                                os.makedirs(os.path.dirname(target_path), exist_ok=True)
-                                
-                                # Write the file
-                                try:
-                                    with open(target_path, 'wb') as target:
-                                        target.write(source.read())
-                                except PermissionError:
-                                    error_msg = f"Permission denied when writing to {target_path}"
-                                    log_error(error_msg)
-                                    raise
-                except zipfile.BadZipFile:
-                    error_msg = "The downloaded file is not a valid zip file"
+                    written, reused = PhlankaUpdateChecker.install_from_zip(temp_path, addon_dir)
+                    print(f"Installed update: {written} files written, {reused} unchanged files reused")
+                except zipfile.BadZipFile as e:
+                    error_msg = f"The downloaded file is not a valid update: {e}"
                     log_error(error_msg)
-                    bpy.app.timers.register(
-                        lambda: show_message_box("Update failed", error_msg), 
-                        first_interval=0.1
-                    )
+                    messages.put(("Update failed", error_msg))
                     return
-                
-                # Clean up - move this to after we're done with the zip file
-                try:
-                    # Close any open file handles to the zip
-                    zip_ref.close()
-                    # Wait a moment to ensure file handles are released
-                    time.sleep(0.5)
-                    os.unlink(temp_path)
-                    print(f"Removed temporary file: {temp_path}")
-                except Exception as e:
-                    print(f"Warning: Could not remove temporary file {temp_path}: {str(e)}")
-                    # Not critical, can continue
+                except PermissionError as e:
+                    log_error(f"Permission denied when installing to {addon_dir}: {e}")
+                    raise
                 
                 # Show success message and reload addons
                 print(f"Update to version {version} completed successfully")
-                bpy.app.timers.register(
-                    lambda: show_message_box("Update successful", f"PhlankaFortnite has been updated to version {version}. Please restart Blender to complete the update."), 
-                    first_interval=0.1
-                )
+                messages.put(("Update successful", f"PhlankaFortnite has been updated to version {version}. Please restart Blender to complete the update."))
                 
             except Exception as e:
                 error_message = str(e)
                 log_error(f"Error during update: {error_message}")
                 traceback.print_exc()
-                bpy.app.timers.register(
-                    lambda: show_message_box("Update failed", f"Error during update: {error_message}"), 
-                    first_interval=0.1
-                )
+                messages.put(("Update failed", f"Error during update: {error_message}"))
+            finally:
+                # Clean up the downloaded zip
+                if temp_path and os.path.exists(temp_path):
+                    try:
+                        os.unlink(temp_path)
+                        print(f"Removed temporary file: {temp_path}")
+                    except OSError as e:
+                        print(f"Warning: Could not remove temporary file {temp_path}: {str(e)}")
+        
+        def poll():
+            try:
+                title, message = messages.get_nowait()
+            except queue.Empty:
+                if thread.is_alive():
+                    return 0.2
+                # The thread may have finished between the two checks
+                if messages.empty():
+                    return None
+                title, message = messages.get_nowait()
+            show_message_box(title, message)
+            return None  # Don't repeat the timer
         
         # Start download in a separate thread to avoid freezing Blender
-        threading.Thread(target=download_thread).start()
+        thread = threading.Thread(target=download_thread)
+        thread.start()
+        # Persistent, so a file load while downloading doesn't drop the timer
+        bpy.app.timers.register(poll, first_interval=0.2, persistent=True)
+
+def check_for_updates_async(callback, force=False):
+    """Run the update check on a worker thread and hand the result to callback on the main thread"""
+    global _check_in_progress
+    if _check_in_progress:
+        return False
+    _check_in_progress = True
+    
+    # Anything touching bpy is resolved here, on the main thread
+    current_version = PhlankaUpdateChecker.get_addon_version()
+    cache_path = PhlankaUpdateChecker.get_cache_path()
+    ttl = 0 if force else UPDATE_CACHE_TTL
+    
+    # The timer registry isn't thread-safe, so the worker only fills a queue
+    # and a timer registered here, on the main thread, polls it
+    results = queue.Queue()
+    
+    def check_thread():
+        result = (False, None, None)
+        try:
+            result = PhlankaUpdateChecker.is_update_available(current_version, cache_path, ttl)
+        except Exception as e:
+            log_error(f"Error checking for updates: {e}")
+        finally:
+            results.put(result)
+    
+    def poll():
+        global _check_in_progress
+        try:
+            result = results.get_nowait()
+        except queue.Empty:
+            if thread.is_alive():
+                return 0.2
+            # The thread may have finished between the two checks
+            result = results.get_nowait() if not results.empty() else (False, None, None)
+        try:
+            callback(*result)
+        finally:
+            _check_in_progress = False
+        return None  # Don't repeat the timer
+    
+    thread = threading.Thread(target=check_thread, daemon=True)
+    try:
+        thread.start()
+        # Persistent, so a file load while checking doesn't drop the timer
+        bpy.app.timers.register(poll, first_interval=0.2, persistent=True)
+    except Exception:
+        _check_in_progress = False
+        raise
+    return True
 
 def show_message_box(title, message):
     def draw(self, context):
@@ -223,15 +447,19 @@ class PHLANKA_OT_check_for_updates(bpy.types.Operator):
     bl_description = "Check for updates to the PhlankaFortnite addon"
     
     def execute(self, context):
-        update_available, latest_version, tag_name = PhlankaUpdateChecker.is_update_available()
-        if update_available:
-            self.report({'INFO'}, f"Update available: {latest_version}")
-            bpy.ops.phlanka.update_dialog('INVOKE_DEFAULT', version=latest_version, tag_name=tag_name)
+        # A manual check skips the TTL but still sends the cached ETag
+        if check_for_updates_async(on_manual_check_result, force=True):
+            self.report({'INFO'}, "Checking for updates...")
         else:
-            self.report({'INFO'}, "No updates available")
-            show_message_box("No Updates", "You have the latest version of PhlankaFortnite")
+            self.report({'INFO'}, "An update check is already running")
         return {'FINISHED'}
 
+def on_manual_check_result(update_available, latest_version, tag_name):
+    if update_available:
+        bpy.ops.phlanka.update_dialog('INVOKE_DEFAULT', version=latest_version, tag_name=tag_name)
+    else:
+        show_message_box("No Updates", "You have the latest version of PhlankaFortnite")
+
 class PHLANKA_OT_update_dialog(bpy.types.Operator):
     bl_idname = "phlanka.update_dialog"
     bl_label = "Update Available"
@@ -282,10 +510,13 @@ def check_for_updates_on_startup(dummy):
     bpy.app.timers.register(check_for_updates_delayed, first_interval=3.0)
 
 def check_for_updates_delayed():
-    update_available, latest_version, tag_name = PhlankaUpdateChecker.is_update_available()
+    # The network request runs in the background; within the TTL it is served from disk
+    check_for_updates_async(on_startup_check_result)
+    return None  # Don't repeat the timer
+
+def on_startup_check_result(update_available, latest_version, tag_name):
     if update_available:
         bpy.ops.phlanka.update_dialog('INVOKE_DEFAULT', version=latest_version, tag_name=tag_name)
-    return None  # Don't repeat the timer
 
 classes = (
     PHLANKA_OT_check_for_updates,